@@ -2,18 +2,18 @@ import subprocess
 import platform
 import os
 import sys
-import ctypes
 import json
-from ctypes import windll, wintypes, byref, c_ubyte, sizeof
+import queue
 import re
-import winreg
-import traceback
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from datetime import datetime
+import struct
+import time
 import threading
-import webbrowser
-from PIL import Image, ImageTk
+
+# Everything else is imported where it is used, so that importing the checker
+# stays cheap and works on any OS. ctypes and winreg are only imported by the
+# probes that need them, tkinter and PIL by load_gui_modules()
+
+tk = ttk = messagebox = filedialog = Image = ImageTk = None
 
 # Definition of colors and style
 
@@ -29,9 +29,2105 @@ COLORS = {
     "disabled": "#666666"
 }
 
-class Win11Checker:
+# Commands used by the probes
+
+# CPU, memory and disk inventory, collected with a single PowerShell launch.
+# Every instance is printed as a "[Class]" header followed by Property=Value lines
+
+INVENTORY_QUERIES = [
+    ("Win32_Processor", ("Name", "NumberOfCores", "MaxClockSpeed")),
+    ("Win32_ComputerSystem", ("TotalPhysicalMemory",)),
+    ("Win32_LogicalDisk", ("Caption", "FreeSpace", "Size"))
+]
+INVENTORY_COMMAND = "powershell -NoProfile -NonInteractive -Command \"" + "; ".join(
+    f"Get-CimInstance {cim_class} | ForEach-Object {{ '[{cim_class}]'; "
+    + "; ".join(f"'{prop}=' + $_.{prop}" for prop in props) + " }"
+    for cim_class, props in INVENTORY_QUERIES
+) + "\""
+TPM_COMMAND = "wmic /namespace:\\\\root\\CIMV2\\Security\\MicrosoftTpm path Win32_Tpm get * /format:list"
+FIRMWARE_COMMAND = "powershell -Command \"(Get-ComputerInfo).BiosFirmwareType\""
+DISKPART_COMMAND = "diskpart /s \"{path}\""
+DISKPART_SCRIPT = "list disk\nexit\n"
+DXDIAG_COMMAND = "dxdiag /t \"{path}\""
+
+# Registry keys and files
+
+DISPLAY_CLASS_KEY = r"SYSTEM\CurrentControlSet\Control\Class\{4d36e968-e325-11ce-bfc1-08002be10318}"
+CURRENT_VERSION_KEY = r"SOFTWARE\Microsoft\Windows NT\CurrentVersion"
+SECURE_BOOT_KEY = r"SYSTEM\CurrentControlSet\Control\SecureBoot\State"
+CONTROL_KEY = r"SYSTEM\CurrentControlSet\Control"
+BOOT_ID_KEY = CONTROL_KEY + r"\Session Manager\Memory Management\PrefetchParameters"
+TPM_KEY = r"SYSTEM\CurrentControlSet\Services\TPM"
+D3D12_PATH = os.environ.get("SystemRoot", "C:\\Windows") + "\\System32\\d3d12.dll"
+
+# Data of a compatible machine, served by FakeProbeBackend
+
+SAMPLE_OUTPUTS = {
+    INVENTORY_COMMAND: (
+        "[Win32_Processor]\r\nName=Intel(R) Core(TM) i7-8700 CPU @ 3.20GHz\r\nNumberOfCores=6\r\nMaxClockSpeed=3192\r\n"
+        "[Win32_ComputerSystem]\r\nTotalPhysicalMemory=17058758656\r\n"
+        "[Win32_LogicalDisk]\r\nCaption=C:\r\nFreeSpace=214748364800\r\nSize=511101108224\r\n"
+        "[Win32_LogicalDisk]\r\nCaption=D:\r\nFreeSpace=\r\nSize=\r\n"
+    ),
+    TPM_COMMAND: "IsActivated_InitialValue=TRUE\r\nIsEnabled_InitialValue=TRUE\r\nSpecVersion=2.0, 0, 1.38\r\n",
+    FIRMWARE_COMMAND: "Uefi\r\n",
+    DISKPART_COMMAND: (
+        "  Disk ###  Status         Size     Free     Dyn  Gpt\r\n"
+        "  --------  -------------  -------  -------  ---  ---\r\n"
+        "  Disk 0    Online          476 GB      0 B        *\r\n"
+    ),
+    DXDIAG_COMMAND: "   DirectX Version: DirectX 12\r\n       Driver Model: WDDM 2.7\r\n"
+}
+
+# FIRMWARE_TYPE values of GetFirmwareType and PEFirmwareType
+
+FIRMWARE_TYPES = {1: "BIOS", 2: "UEFI"}
+
+SAMPLE_REGISTRY = {
+    DISPLAY_CLASS_KEY + "\\0000": {"DriverVersion": "27.20.100.8681"},
+    CURRENT_VERSION_KEY: {"CurrentBuildNumber": "19045"},
+    SECURE_BOOT_KEY: {"UEFISecureBootEnabled": 1},
+    CONTROL_KEY: {"PEFirmwareType": 2},
+    BOOT_ID_KEY: {"BootId": 42}
+}
+
+SAMPLE_FILES = {D3D12_PATH}
+
+SAMPLE_PLATFORM = {"machine": "AMD64", "processor": "Intel64 Family 6 Model 158 Stepping 10, GenuineIntel", "bits": "64bit"}
+
+
+# Output parsers. Console tools write in the OEM code page, reports redirected
+# to a file may be UTF-16 and wmic ends its lines with \r\r\n, so the raw
+# output goes through decode_output() first. Each parser then reads the text
+# in one pass into plain records, without regular expressions
+
+oem_codec = None
+
+
+def oem_encoding():
+    """Codec of the console (OEM) code page, e.g. "cp850"; cp437 outside Windows"""
+    global oem_codec
+    
+    if oem_codec is None:
+        import codecs
+        
+        codec = "cp437"
+        if os.name == "nt":
+            try:
+                import ctypes
+                codec = f"cp{ctypes.windll.kernel32.GetOEMCP()}"
+                codecs.lookup(codec)
+            except (AttributeError, OSError, LookupError):
+                codec = "cp437"
+        oem_codec = codec
+    return oem_codec
+
+
+def decode_output(data, encoding=None):
+    """Decode the raw output of a command or report file.
+
+    A BOM, or NUL high bytes in plain ASCII, mark UTF-16. Otherwise the text
+    is UTF-8 if it decodes as such (plain ASCII does) and in the OEM code page
+    (or encoding) if not. Line ends are left to output_lines().
+    """
+    if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return data.decode("utf-16", errors="replace")
+    if data[:3] == b"\xef\xbb\xbf":
+        return data[3:].decode("utf-8", errors="replace")
+    if len(data) > 1 and data[1] == 0 and data[0] != 0:
+        return data.decode("utf-16-le", errors="replace")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode(encoding or oem_encoding(), errors="replace")
+
+
+def output_lines(text):
+    """Lines of a command output, whatever its line ends (\\n, \\r\\n or wmic's \\r\\r\\n)"""
+    return text.replace("\r", "").split("\n")
+
+
+def wmi_value(value):
+    """Type a WMI property value: TRUE/FALSE as bool, integers as int, empty as None"""
+    if not value:
+        return None
+    if value.isdecimal() or (value[0] == "-" and value[1:].isdecimal()):
+        return int(value)
+    if value == "TRUE":
+        return True
+    if value == "FALSE":
+        return False
+    return value
+
+
+def parse_wmi_list(text):
+    """Parse Name=Value listings into [(class name or None, {name: value})].
+
+    This reads wmic /format:list, where blank lines separate the instances,
+    and INVENTORY_COMMAND, where a "[Class]" line starts each instance.
+    Values are typed with wmi_value().
+    """
+    records = []
+    current = None
+    cim_class = None
+    for line in output_lines(text):
+        line = line.strip()
+        if not line:
+            current = None
+            cim_class = None
+        elif line[0] == "[" and line[-1] == "]":
+            cim_class = line[1:-1]
+            current = {}
+            records.append((cim_class, current))
+        else:
+            name, separator, value = line.partition("=")
+            if not separator:
+                continue
+            if current is None:
+                current = {}
+                records.append((cim_class, current))
+            current[name.strip()] = wmi_value(value.strip())
+    return records
+
+
+def parse_wmi_csv(text):
+    """Parse wmic /format:csv output into [{name: value}], values typed with wmi_value().
+
+    The first line lists the properties (Node first). wmic does not quote its
+    values, so commas in a value end up in the last column.
+    """
+    records = []
+    header = None
+    for line in output_lines(text):
+        if not line.strip():
+            continue
+        cells = line.split(",", len(header) - 1 if header else -1)
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        records.append({name: wmi_value(cell.strip()) for name, cell in zip(header, cells)})
+    return records
+
+
+def parse_inventory(output):
+    """Parse the output of INVENTORY_COMMAND"""
+    records = {}
+    for cim_class, values in parse_wmi_list(output):
+        records.setdefault(cim_class, []).append(values)
+
+    def to_int(value):
+        return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+    # Multi-socket machines report one Win32_Processor per socket, the first one is used
+
+    cpu = (records.get("Win32_Processor") or [{}])[0]
+    system = (records.get("Win32_ComputerSystem") or [{}])[0]
+    return {
+        "cpu": {
+            "name": str(cpu.get("Name") or ""),
+            "cores": to_int(cpu.get("NumberOfCores")),
+            "max_clock_mhz": to_int(cpu.get("MaxClockSpeed"))
+        },
+        "total_physical_memory": to_int(system.get("TotalPhysicalMemory")),
+        "logical_disks": [
+            {
+                "caption": str(disk.get("Caption") or ""),
+                "free_space": to_int(disk.get("FreeSpace")),
+                "size": to_int(disk.get("Size"))
+            }
+            # Drives without media (e.g. empty DVD drives) have no size
+            for disk in records.get("Win32_LogicalDisk", []) if disk.get("Size")
+        ]
+    }
+
+
+def wddm_from_driver_version(driver_version):
+    """Map a display driver version such as 27.20.100.8681 to its WDDM version (2.7)"""
+    try:
+        major = int(str(driver_version).split(".")[0])
+    except ValueError:
+        return 0.0
+        
+    # 20.x and later encode the WDDM version directly, older drivers use 7.x-10.x for WDDM 1.0-1.3
+
+    if major >= 20:
+        return major / 10
+    return {7: 1.0, 8: 1.1, 9: 1.2, 10: 1.3}.get(major, 0.0)
+
+
+def wddm_from_build(build):
+    """Windows 10 build 10586 or higher ships with WDDM 2.0+"""
+    try:
+        return 2.0 if int(build) >= 10586 else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_dxdiag_report(report):
+    """Read the DirectX and WDDM versions from a dxdiag /t report"""
+    info = {"directx_version": 0, "wddm_version": 0.0}
+    
+    dx_match = re.search(r'DirectX Version: DirectX (\d+)', report)
+    if dx_match:
+        info["directx_version"] = int(dx_match.group(1))
+        
+    # Multi-GPU systems list one driver model per adapter, keep the best
+
+    wddm_versions = [float(v) for v in re.findall(r'Driver Model: WDDM (\d+\.\d+)', report)]
+    if wddm_versions:
+        info["wddm_version"] = max(wddm_versions)
+        
+    return info
+
+
+def parse_tpm_version(output):
+    """TPM version from the Win32_Tpm listing of TPM_COMMAND: 2.0, 1.2 or 0.0 when there is none.
+
+    SpecVersion reads like "2.0, 0, 1.38", its first field is the version.
+    """
+    enabled = False
+    for _, values in parse_wmi_list(output):
+        spec_version = str(values.get("SpecVersion") or "")
+        if spec_version.startswith("2."):
+            return 2.0
+        if spec_version.startswith("1."):
+            return 1.2
+        enabled = enabled or values.get("IsEnabled_InitialValue") is True
+        
+    # We assume TPM 2.0 if it is enabled but we can't determine the version
+
+    return 2.0 if enabled else 0.0
+
+
+# reg query prints REG_DWORD and REG_QWORD values in hex, REG_MULTI_SZ strings
+# joined by a literal \0; the values are typed as winreg returns them
+
+REG_VALUE_TYPES = {
+    "REG_DWORD": lambda value: int(value, 16),
+    "REG_QWORD": lambda value: int(value, 16),
+    "REG_MULTI_SZ": lambda value: value.split("\\0") if value else [],
+    "REG_BINARY": bytes.fromhex
+}
+
+
+def parse_reg_query(output):
+    """Parse the output of "reg query" into {key path: {value name: value}}.
+
+    Key paths are returned without their HKEY_LOCAL_MACHINE prefix. Value
+    lines are indented and separate name, type and data by four spaces;
+    names and data may contain spaces themselves. The localized summary
+    of /s ("End of search: ...") is skipped.
+    """
+    keys = {}
+    values = None
+    for line in output_lines(output):
+        if line.startswith("HKEY_"):
+            values = keys.setdefault(line.rstrip().partition("\\")[2], {})
+            continue
+        if values is None or not line.startswith(" "):
+            continue
+            
+        line = line.strip()
+        index = line.find("    REG_")
+        if index < 0:
+            continue
+        value_type, _, value = line[index + 4:].partition("    ")
+        try:
+            value = REG_VALUE_TYPES[value_type](value.strip()) if value_type in REG_VALUE_TYPES else value.strip()
+        except ValueError:
+            value = value.strip()
+        values[line[:index].strip()] = value
+    return keys
+
+
+def parse_diskpart_table(output):
+    """Parse the tables diskpart prints ("list disk", "list volume"...) into rows of stripped cells.
+
+    Column headers are localized, so the columns are located through the
+    dashes below the headers: each cell runs from the start of its column to
+    the start of the next one, or to the end of the line for the last column.
+    The table ends at the first blank line after its rows.
+    """
+    rows = []
+    starts = None
+    for line in output_lines(output):
+        if starts is None:
+            stripped = line.strip()
+            if stripped and stripped[0] == "-" and not stripped.strip("- "):
+                starts = [index for index, char in enumerate(line) if char == "-" and (index == 0 or line[index - 1] == " ")]
+            continue
+        if not line.strip():
+            if rows:
+                break
+            continue
+        bounds = starts[1:] + [None]
+        rows.append([line[start:end].strip() for start, end in zip(starts, bounds)])
+    return rows
+
+
+# Size units of diskpart, English and French ("Go")
+
+DISKPART_UNITS = {"B": 0, "KB": 1, "MB": 2, "GB": 3, "TB": 4, "O": 0, "KO": 1, "MO": 2, "GO": 3, "TO": 4}
+
+
+def diskpart_size(cell):
+    """Bytes of a diskpart size such as "476 GB", None when it cannot be read"""
+    number, _, unit = cell.partition(" ")
+    if not number.isdecimal() or unit.strip().upper() not in DISKPART_UNITS:
+        return None
+    return int(number) * 1024 ** DISKPART_UNITS[unit.strip().upper()]
+
+
+def parse_diskpart_disks(output):
+    """Parse the table printed by diskpart's "list disk" into
+    [{"disk": number, "status": text, "size": bytes, "free": bytes, "dynamic": bool, "gpt": bool}].
+
+    Dyn and Gpt hold a "*" for dynamic and GPT disks; Gpt is the last column.
+    """
+    disks = []
+    for cells in parse_diskpart_table(output):
+        digits = "".join(char for char in cells[0] if char.isdecimal())
+        if not digits:
+            continue
+        disk = {"disk": int(digits), "gpt": cells[-1] == "*"}
+        if len(cells) == 6:
+            disk.update(status=cells[1], size=diskpart_size(cells[2]), free=diskpart_size(cells[3]), dynamic=cells[4] == "*")
+        disks.append(disk)
+    return disks
+
+
+# CPU support database. The families are tried in order on the normalised CPU
+# name: the "number" group of the first matching pattern is the generation (or
+# model series) of the CPU, supported from "min" on. Families whose model numbers
+# are not generations map them through "generations"; families without a number
+# group, or numbers missing from the map, have the fixed "generation". Models
+# are exceptions to their family's rule.
+# COMPCHECKWIN11_CPU_DATABASE may point to a newer database in the same format
+
+CPU_DATABASE = {
+    "version": "2024.11",
+    "models": {
+        "i7-7820hq": True
+    },
+    "families": [
+        {"family": "intel_core_ultra", "pattern": r"\bcore ultra [3579] (?P<number>\d)\d\d", "min": 1},
+        {"family": "intel_core", "pattern": r"\bcore [357] (?P<number>\d)\d\d[a-z]", "min": 1},
+        {"family": "intel_core_i", "pattern": r"\bi3-n\d{3}", "generation": 12},
+        {"family": "intel_core_i", "pattern": r"\bi[3579]-\d{3}[a-z]*\b", "generation": 1, "min": 8},
+        {"family": "intel_core_i", "pattern": r"\bi[3579]-(?P<number>1[0-4])\d{3}", "min": 8},
+        {"family": "intel_core_i", "pattern": r"\bi[3579]-(?P<number>1[0-3])\d\d[a-z]", "min": 8},
+        {"family": "intel_core_i", "pattern": r"\bi[3579]-(?P<number>[2-9])\d{3}", "min": 8},
+        {"family": "intel_core_m", "pattern": r"\bm[357]?-(?P<number>\d)y", "min": 8},
+        {"family": "intel_core_m", "pattern": r"\bm[357]-(?P<number>\d)\d{3}y", "min": 8},
+        {"family": "intel_xeon_scalable", "pattern": r"\bxeon .*\b(?:bronze|silver|gold|platinum) \d(?P<number>\d)\d\d", "min": 2},
+        {"family": "intel_xeon_w", "pattern": r"\bxeon .*\bw-1\d{3}", "generation": 10},
+        {"family": "intel_xeon_w", "pattern": r"\bxeon .*\bw-[23](?P<number>\d)\d\d", "min": 2},
+        {"family": "intel_xeon_w", "pattern": r"\bxeon .*\bw[3579]-[23](?P<number>\d)\d\d", "min": 2},
+        {"family": "intel_xeon_e", "pattern": r"\bxeon .*\be-2(?P<number>\d)\d\d", "min": 1},
+        {"family": "intel_xeon", "pattern": r"\bxeon\b", "min": 1},
+        {"family": "intel_pentium", "pattern": r"\bpentium .*\bg(?P<number>\d\d)\d\d", "min": 8,
+         "generations": {"20": 3, "21": 3, "22": 3, "32": 4, "33": 4, "34": 4, "44": 6, "45": 6, "46": 7,
+                         "54": 8, "55": 8, "56": 8, "64": 10, "65": 10, "66": 10, "74": 12}},
+        {"family": "intel_pentium", "pattern": r"\bpentium .*\b[jn](?P<number>\d)\d{3}", "min": 5},
+        {"family": "intel_pentium", "pattern": r"\bpentium .*\b(?P<number>\d)\d{3}[uy]?\b", "min": 5},
+        {"family": "intel_celeron", "pattern": r"\bceleron .*\bg(?P<number>\d\d)\d\d", "min": 8,
+         "generations": {"16": 3, "18": 4, "39": 6, "49": 8, "59": 10, "69": 12}},
+        {"family": "intel_celeron", "pattern": r"\bceleron .*\b[jn](?P<number>\d)\d{3}", "min": 4},
+        {"family": "intel_celeron", "pattern": r"\bceleron .*\b(?P<number>\d)\d{3}[uy]?\b", "min": 4},
+        {"family": "intel_processor", "pattern": r"\bintel (?:processor )?n\d{2,3}\b", "generation": 12},
+        {"family": "intel_atom", "pattern": r"\batom .*\bx(?P<number>\d)\d{3}", "min": 6},
+        {"family": "amd_threadripper", "pattern": r"\bthreadripper (?:pro )?(?P<number>\d)\d{3}", "min": 2},
+        {"family": "amd_ryzen_ai", "pattern": r"\bryzen ai\b", "generation": 9},
+        {"family": "amd_ryzen", "pattern": r"\bryzen z\d", "generation": 7},
+        {"family": "amd_ryzen", "pattern": r"\bryzen [3579] (?:pro )?(?P<number>\d)\d{3}", "min": 2},
+        {"family": "amd_athlon", "pattern": r"\bathlon (?:pro )?(?:gold |silver )?(?P<number>\d)\d{2,3}[a-z]*\b", "min": 3},
+        {"family": "amd_epyc", "pattern": r"\bepyc (?:embedded )?\d{3}(?P<number>\d)", "min": 2},
+        {"family": "qualcomm_snapdragon", "pattern": r"\bsnapdragon .*\b8(?P<number>35)\b", "min": 50},
+        {"family": "qualcomm_snapdragon", "pattern": r"\bsnapdragon\b|\bsq[1-3]\b", "generation": 1}
+    ]
+}
+
+# Names the compiled database remembers, beyond which the memo starts over
+
+CPU_MEMO_SIZE = 65536
+
+
+def normalise_cpu_name(name):
+    """Lower-case CPU name without trademarks, "CPU" and clock speed, single spaced"""
+    name = re.sub(r"\((?:r|tm)\)|[\u00ae\u2122]|\bcpu\b|@.*$", " ", name.lower())
+    return " ".join(name.split())
+
+
+def loosen_cpu_name(name):
+    """Fuzzy variant of a normalised name, mending the usual OEM manglings:
+    "corei7 8700", "i7 8700", "ryzen5 3600"
+    """
+    name = re.sub(r"(core|ryzen|ultra)(i?\d)", r"\1 \2", name)
+    name = re.sub(r"\b([im][3579]) (\d)", r"\1-\2", name)
+    return name
+
+
+class CpuDatabase:
+    """CPU support database compiled for lookups: model exceptions are hashed,
+    family patterns precompiled, and every classified name is memoised
+    """
+
+    def __init__(self, data):
+        self.version = data["version"]
+        self.models = {model.lower(): supported for model, supported in data["models"].items()}
+        self.families = [
+            (family["family"], re.compile(family["pattern"]), family.get("min", 0), family.get("generation", 0),
+             family.get("generations"))
+            for family in data["families"]
+        ]
+        self.memo = {}
+
+    def classify(self, cpu_name):
+        """Return {"family", "generation", "supported", "match"} of a CPU name.
+
+        match tells how the name was recognised: "rule", "model", "fuzzy", or
+        "none" for unknown CPUs, which are not supported.
+        """
+        result = self.memo.get(cpu_name)
+        if result is None:
+            if len(self.memo) >= CPU_MEMO_SIZE:
+                self.memo.clear()
+            result = self.memo[cpu_name] = self.lookup(cpu_name)
+        return result
+
+    def lookup(self, cpu_name):
+        name = normalise_cpu_name(cpu_name)
+        result = self.match(name, "rule")
+        if result is None:
+            result = self.match(loosen_cpu_name(name), "fuzzy")
+        if result is None:
+            result = {"family": "unknown", "generation": 0, "supported": False, "match": "none"}
+        return result
+
+    def match(self, name, how):
+        for family, pattern, minimum, generation, generations in self.families:
+            found = pattern.search(name)
+            if found is None:
+                continue
+            number = found.groupdict().get("number")
+            if number and generations is not None:
+                generation = generations.get(number, generation)
+            elif number:
+                generation = int(number)
+            result = {"family": family, "generation": generation, "supported": generation >= minimum, "match": how}
+            
+            # Models supported, or not, against the rule of their family
+
+            for token in name.split():
+                if token in self.models:
+                    result.update(supported=self.models[token], match="model")
+            return result
+        return None
+
+
+compiled_cpu_database = None
+
+
+def cpu_database():
+    """The CPU support database, compiled on first use"""
+    global compiled_cpu_database
+    if compiled_cpu_database is None:
+        data = CPU_DATABASE
+        path = os.environ.get("COMPCHECKWIN11_CPU_DATABASE")
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        compiled_cpu_database = CpuDatabase(data)
+    return compiled_cpu_database
+
+
+class ProbeCancelled(Exception):
+    """Raised by a backend when the scan was cancelled while a command was running"""
+
+
+def kill_process_tree(process, reap=True):
+    """Kill a probe process with its children, e.g. wmic started by cmd.exe.
+
+    reap=False leaves the reaping to the caller, e.g. for an asyncio process.
+    """
+    try:
+        if os.name == "nt":
+            subprocess.run(f"taskkill /F /T /PID {process.pid}", stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            import signal
+            os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+        
+    try:
+        process.kill()
+        if reap:
+            process.communicate(timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def command_argv(command):
+    """Split a probe command into the argv run without a shell.
+
+    Quotes group words, backslashes are kept as they are: they are path
+    separators in these commands, not escapes.
+    """
+    import shlex
+    
+    lexer = shlex.shlex(command, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ""
+    lexer.commenters = ""
+    return list(lexer)
+
+
+class Span:
+    """A timed operation of a scan: the scan itself, a check, a probe, a shared fact or a command.
+
+    Exceptions swallowed by the probes while the span is open are kept as
+    events, an exception leaving the span is its error.
+    """
+
+    __slots__ = ("tracer", "id", "trace_id", "parent_id", "name", "attributes", "events", "error",
+                 "start_time", "start", "duration", "thread", "previous")
+
+    def __init__(self, tracer, name, parent, attributes):
+        self.tracer = tracer
+        self.id = next(tracer.ids)
+        self.parent_id = parent.id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(8).hex()
+        self.name = name
+        self.attributes = attributes
+        self.events = []
+        self.error = None
+        self.duration = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name, **attributes):
+        self.events.append({"name": name, "offset_ms": round((time.perf_counter() - self.start) * 1000, 3), **attributes})
+
+    def __enter__(self):
+        self.previous = self.tracer.current_span.set(self)
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        for sink in self.tracer.sinks:
+            sink.start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.current_span.reset(self.previous)
+        self.previous = None
+        for sink in list(self.tracer.sinks):
+            sink.end(self)
+        return False
+
+    def as_dict(self):
+        return {
+            "trace": self.trace_id,
+            "span": self.id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "thread": self.thread,
+            "attributes": self.attributes,
+            "events": self.events,
+            "error": self.error
+        }
+
+
+class NullSpan:
+    """Stands in for Span while no sink is attached, so that tracing costs next to nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Hands out spans and passes the finished ones to the attached sinks.
+
+    A span is the child of the span open in the same thread or asyncio task,
+    or of an explicit parent for work handed to another thread.
+    """
+
     def __init__(self):
-        self.results = {
+        import contextvars
+        
+        self.sinks = []
+        self.current_span = contextvars.ContextVar("current_span", default=None)
+        self.ids = iter(range(1, sys.maxsize))
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def span(self, name, parent=None, **attributes):
+        if not self.sinks:
+            return NULL_SPAN
+        if parent is None or parent is NULL_SPAN:
+            parent = self.current_span.get()
+        return Span(self, name, parent, attributes)
+
+    def current(self):
+        """The span open in this thread or task, None without sinks"""
+        return self.current_span.get()
+
+    def swallowed(self):
+        """Record the exception being handled on the current span, for the probes' bare excepts"""
+        span = self.current_span.get()
+        if span is None:
+            return
+        exc_type, exc, _ = sys.exc_info()
+        if exc_type is not None:
+            span.add_event("exception", type=exc_type.__name__, message=str(exc),
+                           function=sys._getframe(1).f_code.co_name)
+
+
+class TraceSink:
+    """Receives every span as it starts and once it has ended"""
+
+    def start(self, span):
+        pass
+
+    def end(self, span):
+        raise NotImplementedError
+
+
+class RingBufferSink(TraceSink):
+    """Keeps the last capacity spans in memory, e.g. for the timeline of the GUI"""
+
+    def __init__(self, capacity=2000):
+        import collections
+        
+        self.buffer = collections.deque(maxlen=capacity)
+
+    def end(self, span):
+        self.buffer.append(span.as_dict())
+
+    def spans(self, trace_id=None):
+        return [span for span in list(self.buffer) if trace_id is None or span["trace"] == trace_id]
+
+
+class JsonLinesSink(TraceSink):
+    """Appends every span to a file as one JSON line"""
+
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def end(self, span):
+        line = json.dumps(span.as_dict(), default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class OpenTelemetrySink(TraceSink):
+    """Forwards the spans to the OpenTelemetry tracer provider configured by the application.
+
+    Needs the opentelemetry-api package, ImportError otherwise.
+    """
+
+    def __init__(self, otel_tracer=None):
+        from opentelemetry import trace
+        
+        self.trace = trace
+        self.otel_tracer = otel_tracer or trace.get_tracer("CompCheckWin11")
+        self.open_spans = {}
+
+    def start(self, span):
+        parent = self.open_spans.get(span.parent_id)
+        context = self.trace.set_span_in_context(parent) if parent is not None else None
+        self.open_spans[span.id] = self.otel_tracer.start_span(span.name, context=context,
+                                                               start_time=int(span.start_time * 1e9))
+
+    def end(self, span):
+        otel_span = self.open_spans.pop(span.id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if value is None:
+                continue
+            otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        for event in span.events:
+            otel_span.add_event(event["name"], {key: str(value) for key, value in event.items() if key != "name"})
+        if span.error:
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start_time + span.duration) * 1e9))
+
+
+# Spans of every scan in this process, emitted once a sink is attached
+
+tracer = Tracer()
+
+
+class ProbeBackend:
+    """Source of the raw data read by the probes.
+
+    LiveProbeBackend runs subprocesses, NativeProbeBackend reads the registry
+    and the Win32 API in-process, FakeProbeBackend and ReplayProbeBackend serve
+    recorded data so the whole pipeline runs anywhere.
+    """
+
+    def run(self, command, timeout=None, cancel_event=None):
+        """Run a command and return its output.
+
+        Raises subprocess.TimeoutExpired after timeout seconds and
+        ProbeCancelled once cancel_event is set.
+        """
+        raise NotImplementedError
+
+    def run_to_file(self, command, timeout, cancel_event=None):
+        """Run a command that writes a report to "{path}" and return the report"""
+        raise NotImplementedError
+
+    def run_script(self, command, script, timeout=None, cancel_event=None):
+        """Run a command reading script from "{path}" and return its output, like run().
+
+        The script is written to a unique temporary file, so concurrent scans
+        do not overwrite each other's script.
+        """
+        raise NotImplementedError
+
+    def read_registry_value(self, key_path, name, timeout=None, cancel_event=None):
+        """Read a value below HKEY_LOCAL_MACHINE, None if missing.
+
+        Backends reading the registry through a command bound it like run().
+        """
+        raise NotImplementedError
+
+    def read_registry_subkey_values(self, key_path, name, timeout=None, cancel_event=None):
+        """Read a value from every direct subkey of a key below HKEY_LOCAL_MACHINE"""
+        raise NotImplementedError
+
+    def read_registry_timestamp(self, key_path):
+        """Last write time of a key below HKEY_LOCAL_MACHINE, None if unknown"""
+        raise NotImplementedError
+
+    def file_exists(self, path):
+        raise NotImplementedError
+
+    def platform_info(self):
+        """Return the machine, processor and interpreter bitness reported by the platform module"""
+        raise NotImplementedError
+
+    def native(self, name):
+        """Return a fact read through the Win32 API, NotImplementedError if unavailable"""
+        raise NotImplementedError(name)
+
+
+class LiveProbeBackend(ProbeBackend):
+    """Runs the probe commands on this machine, registry reads included"""
+
+    # How often a running command is checked for timeout and cancellation, in seconds
+
+    POLL_INTERVAL = 0.1
+
+    def run(self, command, timeout=None, cancel_event=None):
+        """The command runs in its own process group so that a hung command is
+        killed together with its children.
+        """
+        with tracer.span("command", command=command) as span:
+            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                       start_new_session=os.name != "nt")
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                try:
+                    output, _ = process.communicate(timeout=self.POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel_event is not None and cancel_event.is_set():
+                        kill_process_tree(process)
+                        raise ProbeCancelled(command)
+                    if deadline is not None and time.monotonic() > deadline:
+                        kill_process_tree(process)
+                        raise subprocess.TimeoutExpired(command, timeout)
+                        
+            span.set(pid=process.pid, exit_code=process.returncode, bytes=len(output))
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, command, output)
+            return decode_output(output)
+
+    def run_to_file(self, command, timeout, cancel_event=None):
+        """The report goes to a unique temporary folder. The process is killed once
+        the timeout expires or cancel_event is set.
+        """
+        import shlex
+        import shutil
+        import tempfile
+        
+        folder = tempfile.mkdtemp(prefix="compcheckwin11_")
+        path = os.path.join(folder, "report.txt")
+        args = command.format(path=path)
+        with tracer.span("command", command=command) as span:
+            process = subprocess.Popen(args if os.name == "nt" else shlex.split(args), start_new_session=os.name != "nt")
+            deadline = time.monotonic() + timeout
+            last_size = -1
+            try:
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ProbeCancelled(command)
+                    if time.monotonic() > deadline:
+                        raise subprocess.TimeoutExpired(command, timeout)
+                        
+                    # The report is complete once the process has exited and the file stopped growing
+
+                    size = os.path.getsize(path) if os.path.exists(path) else -1
+                    if process.poll() is not None and size > 0 and size == last_size:
+                        span.set(pid=process.pid, exit_code=process.returncode, bytes=size)
+                        with open(path, "rb") as f:
+                            return decode_output(f.read())
+                    if process.poll() is not None and size <= 0:
+                        span.set(pid=process.pid, exit_code=process.returncode, bytes=0)
+                        raise subprocess.SubprocessError(f"{command} exited with {process.returncode} without a report")
+                    last_size = size
+                    time.sleep(0.2)
+            finally:
+                if process.poll() is None:
+                    kill_process_tree(process)
+                shutil.rmtree(folder, ignore_errors=True)
+
+    def run_script(self, command, script, timeout=None, cancel_event=None):
+        import tempfile
+        
+        fd, path = tempfile.mkstemp(prefix="compcheckwin11_", suffix=".txt")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(script)
+            return self.run(command.format(path=path), timeout, cancel_event)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def read_registry_value(self, key_path, name, timeout=None, cancel_event=None):
+        try:
+            output = self.run(f"reg query \"HKLM\\{key_path}\" /v {name}", timeout, cancel_event)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return parse_reg_query(output).get(key_path, {}).get(name)
+
+    def read_registry_subkey_values(self, key_path, name, timeout=None, cancel_event=None):
+        try:
+            output = self.run(f"reg query \"HKLM\\{key_path}\" /s /v {name}", timeout, cancel_event)
+        except (OSError, subprocess.CalledProcessError):
+            return []
+            
+        prefix = key_path + "\\"
+        return [
+            values[name] for path, values in parse_reg_query(output).items()
+            if path.startswith(prefix) and "\\" not in path[len(prefix):] and name in values
+        ]
+
+    def read_registry_timestamp(self, key_path):
+        # reg query does not show when a key was written
+
+        return None
+
+    def file_exists(self, path):
+        return os.path.exists(path)
+
+    def platform_info(self):
+        return {
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "bits": platform.architecture()[0]
+        }
+
+
+# Win32 structures, decoded with struct so that they can be tested with fake buffers.
+# MEMORYSTATUSEX: dwLength, dwMemoryLoad, then seven DWORDLONG byte counts
+
+MEMORYSTATUSEX_FORMAT = "<II7Q"
+
+# SYSTEM_INFO starts with the WORD wProcessorArchitecture, the rest depends on the pointer size
+
+SYSTEM_INFO_SIZE = 64
+PROCESSOR_ARCHITECTURES = {0: "x86", 5: "ARM", 6: "IA64", 9: "AMD64", 12: "ARM64"}
+
+
+def parse_memory_status(buffer):
+    """Decode a MEMORYSTATUSEX filled by GlobalMemoryStatusEx"""
+    fields = struct.unpack_from(MEMORYSTATUSEX_FORMAT, buffer)
+    return {
+        "memory_load": fields[1],
+        "total_physical": fields[2],
+        "available_physical": fields[3]
+    }
+
+
+def parse_system_info(buffer):
+    """Decode the processor architecture of a SYSTEM_INFO filled by GetNativeSystemInfo"""
+    architecture = struct.unpack_from("<H", buffer)[0]
+    return {
+        "architecture": PROCESSOR_ARCHITECTURES.get(architecture, str(architecture)),
+        "is_64bit": architecture in (6, 9, 12)
+    }
+
+
+def drives_from_bitmask(mask):
+    """Turn the bitmask returned by GetLogicalDrives into drive names (bit 0 is A:)"""
+    return [f"{chr(ord('A') + bit)}:" for bit in range(26) if mask & (1 << bit)]
+
+
+class NativeProbeBackend(LiveProbeBackend):
+    """Reads the registry with winreg and the Win32 API with ctypes, running
+    subprocesses only for what has no in-process equivalent
+    """
+
+    # Win32 API facts served by native(), name -> method
+
+    NATIVE_PROBES = {
+        "memory_status": "get_memory_status",
+        "logical_disks": "get_logical_disks",
+        "system_info": "get_system_info",
+        "firmware_type": "get_firmware_type",
+        "volume_serials": "get_volume_serials"
+    }
+
+    def get_memory_status(self):
+        import ctypes
+        
+        buffer = ctypes.create_string_buffer(struct.calcsize(MEMORYSTATUSEX_FORMAT))
+        struct.pack_into("<I", buffer, 0, len(buffer))
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(buffer):
+            raise ctypes.WinError()
+        return parse_memory_status(buffer.raw)
+
+    def get_system_info(self):
+        import ctypes
+        
+        buffer = ctypes.create_string_buffer(SYSTEM_INFO_SIZE)
+        ctypes.windll.kernel32.GetNativeSystemInfo(buffer)
+        return parse_system_info(buffer.raw)
+
+    def get_firmware_type(self):
+        """FIRMWARE_TYPE from GetFirmwareType, which exists since Windows 8"""
+        import ctypes
+        
+        get_firmware_type = getattr(ctypes.windll.kernel32, "GetFirmwareType", None)
+        if get_firmware_type is None:
+            raise NotImplementedError("firmware_type")
+        firmware_type = ctypes.c_uint()
+        if not get_firmware_type(ctypes.byref(firmware_type)):
+            raise ctypes.WinError()
+        return firmware_type.value
+
+    def get_volume_serials(self):
+        """Serial numbers of the fixed volumes, {drive: serial}"""
+        import ctypes
+        
+        kernel32 = ctypes.windll.kernel32
+        serials = {}
+        for drive in drives_from_bitmask(kernel32.GetLogicalDrives()):
+            serial = ctypes.c_ulong()
+            
+            # 3 is DRIVE_FIXED
+
+            if kernel32.GetDriveTypeW(drive + "\\") == 3 and kernel32.GetVolumeInformationW(
+                    drive + "\\", None, 0, ctypes.byref(serial), None, None, None, 0):
+                serials[drive] = serial.value
+        return serials
+
+    def get_logical_disks(self):
+        """Same fields as Win32_LogicalDisk: caption, free_space and size in bytes"""
+        import ctypes
+        
+        kernel32 = ctypes.windll.kernel32
+        
+        # No "insert a disk" dialog for empty card readers and DVD drives
+
+        kernel32.SetThreadErrorMode(1, None)
+        disks = []
+        for drive in drives_from_bitmask(kernel32.GetLogicalDrives()):
+            free_to_caller = ctypes.c_ulonglong()
+            total = ctypes.c_ulonglong()
+            total_free = ctypes.c_ulonglong()
+            if kernel32.GetDiskFreeSpaceExW(drive + "\\", ctypes.byref(free_to_caller),
+                                            ctypes.byref(total), ctypes.byref(total_free)):
+                disks.append({"caption": drive, "free_space": total_free.value, "size": total.value})
+        return disks
+
+    def read_registry_value(self, key_path, name, timeout=None, cancel_event=None):
+        try:
+            import winreg
+        except ImportError:
+            return None
+            
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+                return winreg.QueryValueEx(key, name)[0]
+        except OSError:
+            return None
+
+    def read_registry_timestamp(self, key_path):
+        try:
+            import winreg
+        except ImportError:
+            return None
+            
+        # In 100 ns intervals since 1601
+
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+                return winreg.QueryInfoKey(key)[2]
+        except OSError:
+            return None
+
+    def read_registry_subkey_values(self, key_path, name, timeout=None, cancel_event=None):
+        values = []
+        try:
+            import winreg
+        except ImportError:
+            return values
+            
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+                subkeys = [winreg.EnumKey(key, index) for index in range(winreg.QueryInfoKey(key)[0])]
+        except OSError:
+            return values
+            
+        for subkey in subkeys:
+            value = self.read_registry_value(key_path + "\\" + subkey, name)
+            if value is not None:
+                values.append(value)
+        return values
+
+    def native(self, name):
+        if os.name != "nt" or name not in self.NATIVE_PROBES:
+            raise NotImplementedError(name)
+        return getattr(self, self.NATIVE_PROBES[name])()
+
+
+class FakeProbeBackend(ProbeBackend):
+    """Serves canned data after an artificial delay.
+
+    Lets the check engine be benchmarked on machines without the Windows tools.
+    """
+
+    def __init__(self, outputs=None, latency=0.0, registry=None, files=None, platform=None, native=None,
+                 timestamps=None):
+        self.outputs = SAMPLE_OUTPUTS if outputs is None else outputs
+        self.registry = SAMPLE_REGISTRY if registry is None else registry
+        self.files = SAMPLE_FILES if files is None else files
+        self.platform = SAMPLE_PLATFORM if platform is None else platform
+        self.natives = {} if native is None else native
+        self.timestamps = {} if timestamps is None else timestamps
+        self.durations = {}
+        self.latency = latency
+
+    def command_latency(self, command):
+        """One delay for every command, or per command keyed like the recorded durations ("run:<command>")"""
+        if isinstance(self.latency, dict):
+            return self.latency.get("run:" + command, 0.0)
+        return self.latency
+
+    def run(self, command, timeout=None, cancel_event=None):
+        with tracer.span("command", command=command) as span:
+            latency = self.command_latency(command)
+            if latency:
+                # Simulate a command that hangs past its timeout or gets cancelled
+
+                delay = latency if timeout is None else min(latency, timeout)
+                if cancel_event is not None and cancel_event.wait(delay):
+                    raise ProbeCancelled(command)
+                if cancel_event is None:
+                    time.sleep(delay)
+                if delay < latency:
+                    raise subprocess.TimeoutExpired(command, timeout)
+            if command not in self.outputs:
+                span.set(exit_code=1, bytes=0)
+                raise subprocess.CalledProcessError(1, command)
+            span.set(exit_code=0, bytes=len(self.outputs[command]))
+            return self.outputs[command]
+
+    def run_to_file(self, command, timeout, cancel_event=None):
+        return self.run(command, timeout, cancel_event)
+
+    def run_script(self, command, script, timeout=None, cancel_event=None):
+        return self.run(command, timeout, cancel_event)
+
+    def read_registry_value(self, key_path, name, timeout=None, cancel_event=None):
+        return self.registry.get(key_path, {}).get(name)
+
+    def read_registry_subkey_values(self, key_path, name, timeout=None, cancel_event=None):
+        prefix = key_path + "\\"
+        return [
+            values[name] for path, values in self.registry.items()
+            if path.startswith(prefix) and "\\" not in path[len(prefix):] and name in values
+        ]
+
+    def read_registry_timestamp(self, key_path):
+        return self.timestamps.get(key_path)
+
+    def file_exists(self, path):
+        return path in self.files
+
+    def platform_info(self):
+        return dict(self.platform)
+
+    def native(self, name):
+        if name not in self.natives:
+            raise NotImplementedError(name)
+        return self.natives[name]
+
+
+class ReplayProbeBackend(FakeProbeBackend):
+    """Serves the data recorded by RecordingProbeBackend in a fixture directory.
+
+    manifest.json maps every command to the file holding its output, and
+    stores the registry values and last write times, existing files, platform
+    and native facts, and how long each of them took on the recorded machine.
+    With latency="recorded" every command takes as long as it did there.
+    """
+
+    def __init__(self, fixture_dir, latency=0.0):
+        with open(os.path.join(fixture_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+            
+        outputs = {}
+        for command, file_name in manifest.get("commands", {}).items():
+            with open(os.path.join(fixture_dir, file_name), "r", encoding="utf-8") as f:
+                outputs[command] = f.read()
+                
+        super().__init__(
+            outputs=outputs,
+            latency=latency,
+            registry=manifest.get("registry", {}),
+            files=set(manifest.get("files", [])),
+            platform=manifest.get("platform", {}),
+            native=manifest.get("native", {}),
+            timestamps=manifest.get("timestamps", {})
+        )
+        self.durations = manifest.get("durations", {})
+        if latency == "recorded":
+            self.latency = self.durations
+
+
+class RecordingProbeBackend(ProbeBackend):
+    """Wraps another backend and records everything it returns, for ReplayProbeBackend.
+
+    The duration of every call is recorded as well, the shortest one when a
+    call is repeated, under "run:<command>", "registry:<key>\\<name>" and
+    "native:<name>".
+    """
+
+    def __init__(self, backend, fixture_dir):
+        self.backend = backend
+        self.fixture_dir = fixture_dir
+        self.lock = threading.Lock()
+        self.outputs = {}
+        self.registry = {}
+        self.files = []
+        self.platform = {}
+        self.natives = {}
+        self.timestamps = {}
+        self.durations = {}
+
+    def record_duration(self, key, start):
+        duration = time.perf_counter() - start
+        with self.lock:
+            self.durations[key] = min(duration, self.durations.get(key, duration))
+
+    def run(self, command, timeout=None, cancel_event=None):
+        start = time.perf_counter()
+        output = self.backend.run(command, timeout, cancel_event)
+        self.record_duration("run:" + command, start)
+        with self.lock:
+            self.outputs[command] = output
+        return output
+
+    def run_to_file(self, command, timeout, cancel_event=None):
+        start = time.perf_counter()
+        output = self.backend.run_to_file(command, timeout, cancel_event)
+        self.record_duration("run:" + command, start)
+        with self.lock:
+            self.outputs[command] = output
+        return output
+
+    def run_script(self, command, script, timeout=None, cancel_event=None):
+        # Recorded under the command template, the temporary path changes every run
+
+        start = time.perf_counter()
+        output = self.backend.run_script(command, script, timeout, cancel_event)
+        self.record_duration("run:" + command, start)
+        with self.lock:
+            self.outputs[command] = output
+        return output
+
+    def read_registry_value(self, key_path, name, timeout=None, cancel_event=None):
+        start = time.perf_counter()
+        value = self.backend.read_registry_value(key_path, name, timeout, cancel_event)
+        self.record_duration(f"registry:{key_path}\\{name}", start)
+        if value is not None:
+            with self.lock:
+                self.registry.setdefault(key_path, {})[name] = value
+        return value
+
+    def read_registry_subkey_values(self, key_path, name, timeout=None, cancel_event=None):
+        # Subkey names are not known here, record the values under numbered subkeys
+
+        start = time.perf_counter()
+        values = self.backend.read_registry_subkey_values(key_path, name, timeout, cancel_event)
+        self.record_duration(f"registry:{key_path}\\*\\{name}", start)
+        with self.lock:
+            for index, value in enumerate(values):
+                self.registry.setdefault(f"{key_path}\\{index:04d}", {})[name] = value
+        return values
+
+    def read_registry_timestamp(self, key_path):
+        timestamp = self.backend.read_registry_timestamp(key_path)
+        if timestamp is not None:
+            with self.lock:
+                self.timestamps[key_path] = timestamp
+        return timestamp
+
+    def file_exists(self, path):
+        exists = self.backend.file_exists(path)
+        if exists:
+            with self.lock:
+                self.files.append(path)
+        return exists
+
+    def platform_info(self):
+        info = self.backend.platform_info()
+        with self.lock:
+            self.platform = info
+        return info
+
+    def native(self, name):
+        start = time.perf_counter()
+        value = self.backend.native(name)
+        self.record_duration("native:" + name, start)
+        with self.lock:
+            self.natives[name] = value
+        return value
+
+    def save(self):
+        """Write the recorded data to the fixture directory"""
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        with self.lock:
+            commands = {}
+            for index, (command, output) in enumerate(sorted(self.outputs.items())):
+                file_name = f"output_{index:02d}.txt"
+                with open(os.path.join(self.fixture_dir, file_name), "w", encoding="utf-8") as f:
+                    f.write(output)
+                commands[command] = file_name
+                
+            manifest = {
+                "commands": commands,
+                "registry": self.registry,
+                "files": sorted(set(self.files)),
+                "platform": self.platform,
+                "native": self.natives,
+                "timestamps": self.timestamps,
+                "durations": {key: round(value, 6) for key, value in sorted(self.durations.items())}
+            }
+            
+        with open(os.path.join(self.fixture_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+
+class AsyncProbeBackend(ProbeBackend):
+    """Runs the probe commands as asyncio subprocesses, without a shell.
+
+    prefetch() starts the commands of a scan at once on the running event
+    loop; the probes then read their outputs through run(). A command that was
+    not prefetched, e.g. the dxdiag fallback, is run on the same loop from the
+    probe's worker thread, or on loop when given (see TkAsyncioBridge).
+    Registry, files, platform and native facts come from the wrapped backend.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, backend=None, loop=None):
+        self.backend = backend or NativeProbeBackend()
+        self.loop = loop
+        self.prefetched = {}
+
+    async def run_async(self, command, timeout=None, cancel_event=None, path=None):
+        """Run a command and return its output, raising like ProbeBackend.run()"""
+        import asyncio
+        
+        argv = command_argv(command if path is None else command.format(path=path))
+        with tracer.span("command", command=command) as span:
+            process = await asyncio.create_subprocess_exec(*argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                                           start_new_session=os.name != "nt")
+            deadline = None if timeout is None else time.monotonic() + timeout
+            communicate = asyncio.ensure_future(process.communicate())
+            while True:
+                done, _ = await asyncio.wait({communicate}, timeout=self.POLL_INTERVAL)
+                if done:
+                    output, _ = communicate.result()
+                    break
+                if cancel_event is not None and cancel_event.is_set():
+                    await self.kill(process, communicate)
+                    raise ProbeCancelled(command)
+                if deadline is not None and time.monotonic() > deadline:
+                    await self.kill(process, communicate)
+                    raise subprocess.TimeoutExpired(command, timeout)
+                    
+            span.set(pid=process.pid, exit_code=process.returncode, bytes=len(output))
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, command, output)
+            return decode_output(output)
+
+    async def kill(self, process, communicate):
+        """Kill a command with its children and reap it"""
+        kill_process_tree(process, reap=False)
+        await communicate
+
+    async def run_script_async(self, command, script, timeout=None, cancel_event=None):
+        import tempfile
+        
+        fd, path = tempfile.mkstemp(prefix="compcheckwin11_", suffix=".txt")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(script)
+            return await self.run_async(command, timeout, cancel_event, path=path)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def run_to_file_async(self, command, timeout, cancel_event=None):
+        """Like LiveProbeBackend.run_to_file(), waiting on the loop instead of sleeping"""
+        import asyncio
+        import shutil
+        import tempfile
+        
+        folder = tempfile.mkdtemp(prefix="compcheckwin11_")
+        path = os.path.join(folder, "report.txt")
+        deadline = time.monotonic() + timeout
+        try:
+            await self.run_async(command, timeout, cancel_event, path=path)
+            last_size = -1
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ProbeCancelled(command)
+                if time.monotonic() > deadline:
+                    raise subprocess.TimeoutExpired(command, timeout)
+                size = os.path.getsize(path) if os.path.exists(path) else -1
+                if size > 0 and size == last_size:
+                    with open(path, "rb") as f:
+                        return decode_output(f.read())
+                    
+                # The command has exited: without a report now, there will be none
+
+                if size <= 0:
+                    raise subprocess.SubprocessError(f"{command} exited with 0 without a report")
+                last_size = size
+                await asyncio.sleep(0.2)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    async def prefetch(self, commands, timeout=None, cancel_event=None):
+        """Run commands concurrently and keep their outputs, or the errors they raised, for run().
+
+        commands maps every command to the script it reads from "{path}", or None.
+        """
+        import asyncio
+        
+        self.loop = asyncio.get_running_loop()
+        
+        async def fetch(command, script):
+            try:
+                if script is None:
+                    return await self.run_async(command, timeout, cancel_event)
+                return await self.run_script_async(command, script, timeout, cancel_event)
+            except (OSError, subprocess.SubprocessError, ProbeCancelled) as e:
+                return e
+                
+        with tracer.span("prefetch", commands=len(commands)):
+            outputs = await asyncio.gather(*(fetch(command, script) for command, script in commands.items()))
+        self.prefetched = dict(zip(commands, outputs))
+
+    def call(self, coroutine):
+        """Run a coroutine on the prefetch loop from a probe's worker thread and wait for it.
+
+        Without a loop running elsewhere, e.g. in a plain run_all_checks()
+        or changed_categories() between runs, the coroutine runs on a loop
+        of its own.
+        """
+        import asyncio
+        
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self.loop is not None and self.loop.is_running() and self.loop is not running:
+            return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+        if running is None:
+            return asyncio.run(coroutine)
+            
+        # Called from a running loop, which cannot wait for itself: use a loop on another thread
+
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, coroutine).result()
+
+    def take(self, command):
+        output = self.prefetched.pop(command, None)
+        if isinstance(output, BaseException):
+            raise output
+        return output
+
+    def run(self, command, timeout=None, cancel_event=None):
+        output = self.take(command)
+        if output is None:
+            output = self.call(self.run_async(command, timeout, cancel_event))
+        return output
+
+    def run_script(self, command, script, timeout=None, cancel_event=None):
+        output = self.take(command)
+        if output is None:
+            output = self.call(self.run_script_async(command, script, timeout, cancel_event))
+        return output
+
+    def run_to_file(self, command, timeout, cancel_event=None):
+        return self.call(self.run_to_file_async(command, timeout, cancel_event))
+
+    def read_registry_value(self, key_path, name, timeout=None, cancel_event=None):
+        return self.backend.read_registry_value(key_path, name, timeout, cancel_event)
+
+    def read_registry_subkey_values(self, key_path, name, timeout=None, cancel_event=None):
+        return self.backend.read_registry_subkey_values(key_path, name, timeout, cancel_event)
+
+    def read_registry_timestamp(self, key_path):
+        return self.backend.read_registry_timestamp(key_path)
+
+    def file_exists(self, path):
+        return self.backend.file_exists(path)
+
+    def platform_info(self):
+        return self.backend.platform_info()
+
+    def native(self, name):
+        return self.backend.native(name)
+
+
+def write_stub_executables(folder, outputs=None):
+    """Write POSIX stand-ins for the probe commands (powershell, wmic, diskpart...) to folder.
+
+    Each stub prints the recorded output of the command it was started as,
+    "{path}" matching any argument, and fails for unknown commands. A
+    "{path}" that does not exist yet is a report file and gets the output. With
+    folder first on PATH the asyncio runner starts real processes on Linux.
+    """
+    outputs = SAMPLE_OUTPUTS if outputs is None else outputs
+    os.makedirs(folder, exist_ok=True)
+    table = [[command_argv(command), output] for command, output in outputs.items()]
+    with open(os.path.join(folder, "outputs.json"), "w", encoding="utf-8") as f:
+        json.dump(table, f)
+        
+    stub = (
+        f"#!{sys.executable}\n"
+        "import json, os, sys\n"
+        "table = json.load(open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'outputs.json')))\n"
+        "argv = [os.path.basename(sys.argv[0])] + sys.argv[1:]\n"
+        "for template, output in table:\n"
+        "    if len(template) == len(argv) and all(t == a or '{path}' in t for t, a in zip(template, argv)):\n"
+        "        reports = [a for t, a in zip(template, argv) if '{path}' in t and not os.path.exists(a)]\n"
+        "        for report in reports:\n"
+        "            open(report, 'w').write(output)\n"
+        "        if not reports:\n"
+        "            sys.stdout.write(output)\n"
+        "        sys.exit(0)\n"
+        "sys.exit(1)\n"
+    )
+    names = sorted({argv[0] for argv, _ in table})
+    for name in names:
+        path = os.path.join(folder, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(stub)
+        os.chmod(path, 0o755)
+    return names
+
+
+def check_async_backend():
+    """Compare AsyncProbeBackend with FakeProbeBackend on the sample machine, with and without prefetch.
+
+    The commands run as real processes through the stubs of
+    write_stub_executables(), so this check needs a POSIX system. Without a
+    prefetch the backend must still run commands, from a plain thread as
+    well as from within a running event loop. Behind the TkAsyncioBridge of
+    the window, every command must run on the bridge loop.
+    """
+    import asyncio
+    import shutil
+    import tempfile
+    
+    if os.name == "nt":
+        return {"skipped": "The stub commands need a POSIX system", "passed": True}
+        
+    def statuses(result):
+        return {category: result["details"][category]["status"] for category in Win11Checker.CHECKS}
+        
+    async def call_from_loop(backend):
+        return backend.run(TPM_COMMAND)
+        
+    class LoopRecorder(AsyncProbeBackend):
+        """Notes the loop every command runs on"""
+        
+        loops = []
+        
+        async def run_async(self, command, timeout=None, cancel_event=None, path=None):
+            self.loops.append(asyncio.get_running_loop())
+            return await super().run_async(command, timeout, cancel_event, path)
+            
+
+    expected = statuses(Win11Checker(FakeProbeBackend(), max_workers=1, cache=False).run_all_checks())
+    folder = tempfile.mkdtemp(prefix="compcheckwin11_")
+    path = os.environ.get("PATH", "")
+    os.environ["PATH"] = folder + os.pathsep + path
+    try:
+        write_stub_executables(folder)
+        runs = {}
+        checker = Win11Checker(AsyncProbeBackend(FakeProbeBackend()), cache=False)
+        runs["without_prefetch"] = statuses(checker.run_all_checks(incremental=True))
+        changed = checker.changed_categories()
+        from_loop = asyncio.run(call_from_loop(checker.backend))
+        checker = Win11Checker(AsyncProbeBackend(FakeProbeBackend()), cache=False)
+        runs["with_prefetch"] = statuses(asyncio.run(checker.run_all_checks_async()))
+        runs["after_prefetch"] = statuses(checker.run_all_checks())
+        
+        # As in the window: the scan goes through the bridge, then a command that was not prefetched
+
+        bridge = TkAsyncioBridge()
+        try:
+            checker = Win11Checker(LoopRecorder(FakeProbeBackend(), loop=bridge.loop), cache=False)
+            runs["bridge"] = statuses(bridge.submit(checker.run_all_checks_async()).result())
+            checker.backend.run(TPM_COMMAND)
+        finally:
+            bridge.close()
+        on_bridge = bool(LoopRecorder.loops) and all(loop is bridge.loop for loop in LoopRecorder.loops)
+    finally:
+        os.environ["PATH"] = path
+        shutil.rmtree(folder, ignore_errors=True)
+        
+    failures = [name for name, value in runs.items() if value != expected]
+    if changed:
+        failures.append("changed_categories")
+    if from_loop != SAMPLE_OUTPUTS[TPM_COMMAND]:
+        failures.append("from_running_loop")
+    if not on_bridge:
+        failures.append("bridge_loop")
+    return {"expected": expected, "runs": runs, "failures": failures, "passed": not failures}
+
+
+def default_cache_path():
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "CompCheckWin11", "probe_cache.json")
+
+
+def get_os_build():
+    return platform.version()
+
+
+def get_boot_time():
+    """Return the time the machine booted, None if unknown"""
+    try:
+        if os.name == "nt":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetTickCount64.restype = ctypes.c_uint64
+            return time.time() - kernel32.GetTickCount64() / 1000
+        with open("/proc/uptime") as f:
+            return time.time() - float(f.read().split()[0])
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+def probe_succeeded(category, value):
+    """Tell apart real probe results from the defaults returned when a probe failed"""
+    if category == "cpu":
+        return value["cores"] > 0
+    if category == "ram":
+        return value > 0
+    if category == "storage":
+        return bool(value["all_drives"])
+    if category == "directx":
+        return value["directx_version"] > 0
+        
+    # tpm, secure_boot and gpt are None when they could not be determined
+
+    return value is not None
+
+
+class ProbeCache:
+    """Versioned on-disk cache of raw probe results.
+
+    Every category expires after its own TTL, and the whole cache is dropped
+    when the machine reboots or the OS build changes, since BIOS settings
+    (TPM, Secure Boot) and drivers can only change across a reboot or update.
+    """
+
+    VERSION = 1
+
+    # Lifetime of the entries, in seconds
+
+    TTL = {
+        "cpu": 30 * 86400,
+        "ram": 30 * 86400,
+        "architecture": 30 * 86400,
+        "tpm": 7 * 86400,
+        "secure_boot": 7 * 86400,
+        "gpt": 7 * 86400,
+        "directx": 86400,
+        "storage": 60
+    }
+
+    # Boot times are the wall clock minus the uptime: they jitter by a few
+    # milliseconds, but move with the wall clock when it is corrected, e.g. by a
+    # time sync after a resume, which can be a minute or more off. A reboot moves
+    # them by the whole previous uptime, so two minutes of slack still catches it.
+
+    BOOT_TIME_TOLERANCE = 120
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.build = get_os_build()
+        self.boot_time = get_boot_time()
+        self.entries = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+            
+        if data.get("version") != self.VERSION or data.get("build") != self.build:
+            return {}
+            
+        # Invalidate everything after a reboot
+
+        boot_time = data.get("boot_time")
+        if (boot_time is None) != (self.boot_time is None):
+            return {}
+        if boot_time is not None and abs(boot_time - self.boot_time) > self.BOOT_TIME_TOLERANCE:
+            return {}
+            
+        return data.get("entries", {})
+
+    def get(self, category):
+        """Return (True, value) for a fresh entry, (False, None) otherwise"""
+        with self.lock:
+            entry = self.entries.get(category)
+        if entry and time.time() - entry["time"] < self.TTL.get(category, 0):
+            return True, entry["value"]
+        return False, None
+
+    def put(self, category, value):
+        with self.lock:
+            self.entries[category] = {"time": time.time(), "value": value}
+            self.dirty = True
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.dirty = True
+
+    def save(self):
+        """Write the cache atomically, through a temporary file"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                "version": self.VERSION,
+                "build": self.build,
+                "boot_time": self.boot_time,
+                "entries": dict(self.entries)
+            }
+            self.dirty = False
+            
+        import tempfile
+        
+        try:
+            folder = os.path.dirname(self.path)
+            os.makedirs(folder, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+
+class FactStore:
+    """Facts shared by several probes, computed at most once per run.
+
+    A fact requested by several worker threads at once is computed by the
+    first of them while the others wait for its value.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+        self.values = {}
+
+    def get(self, name, compute):
+        with self.lock:
+            lock = self.locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self.values:
+                self.values[name] = compute()
+            return self.values[name]
+
+
+# Requirements policies. Each rule lists the conditions [fact, operator, value]
+# a category must meet, "essential" the categories a compatible machine must
+# pass. A policy may extend another one, replacing some of its rules. Policy
+# files use the same format, see load_policy()
+
+POLICIES = {
+    "baseline": {
+        "description": "Windows 11 minimum system requirements",
+        "essential": ["cpu", "ram", "storage", "tpm", "secure_boot", "gpt", "architecture"],
+        "rules": {
+            "cpu": [["cpu_cores", ">=", 2], ["cpu_ghz", ">=", 1.0], ["cpu_supported", "==", True]],
+            "ram": [["ram_gb", ">=", 4]],
+            "storage": [["free_gb", ">=", 64]],
+            "tpm": [["tpm_version", ">=", 2.0]],
+            "secure_boot": [["secure_boot", "==", True]],
+            "gpt": [["gpt", "==", True]],
+            "directx": [["directx_version", ">=", 12], ["wddm_version", ">=", 2.0]],
+            "architecture": [["is_64bit", "==", True]]
+        }
+    },
+    "24h2": {
+        "description": "Windows 11 24H2: the DirectX 12 / WDDM 2.0 graphics requirement is enforced too. "
+                       "Its POPCNT and SSE4.2 requirement is met by every CPU of the support database",
+        "extends": "baseline",
+        "essential": ["cpu", "ram", "storage", "tpm", "secure_boot", "gpt", "directx", "architecture"]
+    },
+    "corporate": {
+        "description": "Corporate baseline: 24H2 with at least 4 cores, 8 GB of RAM and 128 GB free",
+        "extends": "24h2",
+        "rules": {
+            "cpu": [["cpu_cores", ">=", 4], ["cpu_ghz", ">=", 1.0], ["cpu_supported", "==", True]],
+            "ram": [["ram_gb", ">=", 8]],
+            "storage": [["free_gb", ">=", 128]]
+        }
+    }
+}
+DEFAULT_POLICY = "baseline"
+
+# Raw facts the policy conditions can test, as computed by policy_facts()
+
+POLICY_FACTS = ("cpu_supported", "cpu_cores", "cpu_ghz", "ram_gb", "free_gb", "tpm_version",
+                "secure_boot", "gpt", "directx_version", "wddm_version", "is_64bit")
+
+POLICY_OPERATORS = {
+    ">=": lambda a, b: a >= b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    "<": lambda a, b: a < b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b
+}
+
+
+class Policy:
+    """A requirements policy compiled into one predicate per category.
+
+    The predicates only combine comparisons with &, so they evaluate the facts
+    of a single host as well as numpy columns of facts of many hosts.
+    """
+
+    def __init__(self, name, data):
+        self.name = name
+        self.description = data.get("description", "")
+        self.essential = list(data["essential"])
+        self.rules = data["rules"]
+        self.predicates = {}
+        for category, conditions in self.rules.items():
+            if category not in Win11Checker.CHECKS:
+                raise ValueError(f"Policy {name}: unknown category {category}")
+            for fact, operator, _ in conditions:
+                if fact not in POLICY_FACTS or operator not in POLICY_OPERATORS:
+                    raise ValueError(f"Policy {name}: invalid condition on {fact} ({operator})")
+            self.predicates[category] = self.compile(conditions)
+        for category in self.essential:
+            if category not in self.predicates:
+                raise ValueError(f"Policy {name}: no rule for essential category {category}")
+
+    @staticmethod
+    def compile(conditions):
+        compiled = [(fact, POLICY_OPERATORS[operator], value) for fact, operator, value in conditions]
+        
+        def predicate(facts):
+            passed = True
+            for fact, operator, value in compiled:
+                passed = passed & operator(facts[fact], value)
+            return passed
+            
+        return predicate
+
+    def passes(self, category, facts):
+        """Whether facts, a mapping of the facts the category's rule tests, meet it"""
+        return bool(self.predicates[category](facts))
+
+    def limit(self, category, fact):
+        """The value a category's rule compares a fact with, e.g. limit("ram", "ram_gb") == 4"""
+        for rule_fact, _, value in self.rules.get(category, []):
+            if rule_fact == fact:
+                return value
+        return None
+
+
+compiled_policies = {}
+
+
+def load_policy(name=None):
+    """Compile a built-in policy (POLICIES) or a JSON policy file, once per process"""
+    name = name or DEFAULT_POLICY
+    if name not in compiled_policies:
+        data = resolve_policy(name, set())
+        compiled_policies[name] = Policy(data.get("name", name), data)
+    return compiled_policies[name]
+
+
+def resolve_policy(name, seen):
+    """Policy data with the policies it extends merged in"""
+    if name in seen:
+        raise ValueError(f"Policy {name} extends itself")
+    seen.add(name)
+    if name in POLICIES:
+        data = POLICIES[name]
+    else:
+        try:
+            with open(name, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except OSError:
+            raise ValueError(f"Unknown policy {name}, expected one of {', '.join(POLICIES)} or a policy file")
+            
+    if "extends" in data:
+        base = resolve_policy(data["extends"], seen)
+        data = {
+            **base,
+            **data,
+            "rules": {**base["rules"], **data.get("rules", {})},
+            "essential": data.get("essential", base["essential"])
+        }
+    return data
+
+
+def policy_facts(raw):
+    """The POLICY_FACTS of a host from its raw probe results, 0 for missing ones"""
+    return {
+        "cpu_supported": cpu_database().classify(str(raw.get("cpu", {}).get("name", "")))["supported"]
+        if isinstance(raw.get("cpu"), dict) else False,
+        "cpu_cores": int(raw_number(raw, "cpu", "cores")),
+        "cpu_ghz": raw_number(raw, "cpu", "frequency"),
+        "ram_gb": raw_number(raw, "ram"),
+        "free_gb": raw_number(raw, "storage", "largest_free_gb"),
+        "tpm_version": raw_number(raw, "tpm"),
+        "directx_version": int(raw_number(raw, "directx", "directx_version")),
+        "wddm_version": raw_number(raw, "directx", "wddm_version"),
+        "is_64bit": bool(raw_number(raw, "architecture", "is_64bit")),
+        "secure_boot": bool(raw_number(raw, "secure_boot")),
+        "gpt": bool(raw_number(raw, "gpt"))
+    }
+
+
+def raw_number(raw, category, key=None):
+    """A numeric raw probe result, 0 when missing or malformed"""
+    try:
+        value = raw[category] if key is None else raw[category][key]
+        return float(value or 0)
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+# Cheap signals that change when a probe result may have changed, read in-process
+# by the native backend: BootId increases at every boot, which any firmware
+# (TPM, Secure Boot) or hardware change requires. bounds are the timeout and
+# cancel_event of the registry reads
+
+CHANGE_SIGNALS = {
+    "boot_id": lambda backend, **bounds: backend.read_registry_value(BOOT_ID_KEY, "BootId", **bounds),
+    "tpm_key": lambda backend, **bounds: backend.read_registry_timestamp(TPM_KEY),
+    "secure_boot_key": lambda backend, **bounds: backend.read_registry_timestamp(SECURE_BOOT_KEY),
+    "secure_boot_enabled": lambda backend, **bounds: backend.read_registry_value(SECURE_BOOT_KEY, "UEFISecureBootEnabled",
+                                                                                 **bounds),
+    "volume_serials": lambda backend, **bounds: backend.native("volume_serials"),
+    "os_build": lambda backend, **bounds: backend.read_registry_value(CURRENT_VERSION_KEY, "CurrentBuildNumber", **bounds),
+    "driver_versions": lambda backend, **bounds: sorted(backend.read_registry_subkey_values(DISPLAY_CLASS_KEY,
+                                                                                            "DriverVersion", **bounds)),
+    "d3d12": lambda backend, **bounds: backend.file_exists(D3D12_PATH)
+}
+
+
+def read_change_signal(backend, name, timeout=None, cancel_event=None):
+    """A change signal, None when the backend cannot read it in time"""
+    try:
+        return CHANGE_SIGNALS[name](backend, timeout=timeout, cancel_event=cancel_event)
+    except:
+        return None
+
+
+class Win11Checker:
+    # Check method of every category
+
+    CHECKS = {
+        "cpu": "check_cpu_compatibility",
+        "ram": "check_ram",
+        "storage": "check_storage",
+        "tpm": "check_tpm",
+        "secure_boot": "check_secure_boot",
+        "gpt": "check_gpt",
+        "directx": "check_directx",
+        "architecture": "check_architecture"
+    }
+
+    # Probe returning the raw, JSON serializable facts of every category
+
+    PROBES = {
+        "cpu": "get_cpu_info",
+        "ram": "get_ram_size",
+        "storage": "get_disk_info",
+        "tpm": "get_tpm_status",
+        "secure_boot": "check_secure_boot_status",
+        "gpt": "check_disk_partition_style",
+        "directx": "get_directx_info",
+        "architecture": "get_architecture_info"
+    }
+
+    # Checks that must run one after the other. Checks sharing a command
+    # share it through the facts instead and still run in parallel
+
+    CHECK_CHAINS = []
+
+    # Method computing each of the facts shared by several probes
+
+    FACTS = {
+        "inventory": "collect_inventory",
+        "partition_style": "get_partition_style",
+        "firmware_type": "get_firmware_type",
+        "os_build": "get_os_build_number"
+    }
+
+    # Commands the asyncio runner starts up front for each category, with the
+    # script they read. The fallbacks (Get-ComputerInfo, dxdiag) only run when needed
+
+    PREFETCH = {
+        "cpu": {INVENTORY_COMMAND: None},
+        "tpm": {TPM_COMMAND: None},
+        "gpt": {DISKPART_COMMAND: DISKPART_SCRIPT}
+    }
+
+    # Change signals fingerprinting the inputs of every category, for the
+    # incremental runs. storage has none: free space changes all the time and
+    # its probe is cheap
+
+    FINGERPRINTS = {
+        "cpu": ("boot_id",),
+        "ram": ("boot_id",),
+        "tpm": ("boot_id", "tpm_key"),
+        "secure_boot": ("boot_id", "secure_boot_key", "secure_boot_enabled"),
+        "gpt": ("boot_id", "volume_serials"),
+        "directx": ("os_build", "driver_versions", "d3d12"),
+        "architecture": ("boot_id",)
+    }
+
+    # Firmware type detectors, cheapest first
+
+    FIRMWARE_TIERS = ("native", "registry", "command")
+
+    # Seconds given to the probes to report once their commands were killed
+
+    ABORT_GRACE = 5.0
+
+    def __init__(self, backend=None, max_workers=4, cache=True, policy=None):
+        self.backend = backend or NativeProbeBackend()
+        self.max_workers = max_workers
+        self.policy = policy if isinstance(policy, Policy) else load_policy(policy)
+        self.timings = {}
+        
+        # Raw probe results of the last run, and the on-disk cache they are kept in
+
+        self.raw_results = {}
+        self.cache = ProbeCache() if cache is True else (cache or None)
+        self.force_refresh = False
+        self.facts = FactStore()
+        
+        # Result of the last run, for export_results()
+
+        self.last_result = None
+        
+        # Raw results collected elsewhere, see from_raw()
+
+        self.preset_results = None
+        
+        # Fingerprints of the raw results last probed, and the categories an
+        # incremental run took over from the previous run
+
+        self.incremental = False
+        self.fingerprints = {}
+        self.signals = FactStore()
+        self.reused = set()
+        
+        # Deadlines in seconds: of every probe, of the whole run and of dxdiag
+
+        self.probe_timeout = 60.0
+        self.run_timeout = 180.0
+        self.dxdiag_timeout = 30.0
+        self.run_deadline = None
+        
+        # cancel_event kills the running commands, on cancel() or when the run
+        # deadline expires. local holds the deadline and interruption of the
+        # probe running in the current worker thread
+
+        self.cancel_event = threading.Event()
+        self.cancelled = False
+        self.local = threading.local()
+        
+        # Span of the running scan, parent of the checks run on the worker threads
+
+        self.scan_span = None
+        
+        # Every run has an ID, and a run that gave up on its stuck checks moves
+        # on to the next one. The results and raw results of checks that
+        # outlived their run are dropped (see run_check_chain)
+
+        self.run_id = 0
+        self.completed = set()
+        self.run_lock = threading.Lock()
+        self.run_results = {
             "cpu": {"status": False, "details": {}},
             "ram": {"status": False, "details": {}},
             "storage": {"status": False, "details": {}},
@@ -43,11 +2139,22 @@ class Win11Checker:
             "architecture": {"status": False, "details": {}}
         }
         
+    @property
+    def results(self):
+        """Results of the current run; within a check, the result that check is writing"""
+        results = getattr(self.local, "results", None)
+        return self.run_results if results is None else results
+        
+    def is_current_run(self):
+        """Whether the check running in this thread, if any, belongs to the current run"""
+        run_id = getattr(self.local, "run_id", None)
+        return run_id is None or run_id == self.run_id
+        
     def check_cpu_compatibility(self):
         try:
             # Get CPU Insights
 
-            cpu_info = self.get_cpu_info()
+            cpu_info = self.probe("cpu")
             
             # Get cores and frequency
 
@@ -56,19 +2163,22 @@ class Win11Checker:
             
             # Controlla se è nella lista CPU compatibili
             cpu_name = cpu_info.get("name", "")
-            cpu_generation = self.detect_cpu_generation(cpu_name)
+            cpu_class = cpu_database().classify(cpu_name)
             
-            # Check minimum requirements (2 cores and 1GHz)
+            # Check minimum requirements (by default 2 cores and 1GHz)
 
-            min_req_met = cores >= 2 and freq >= 1.0
-            generation_ok = cpu_generation >= 8 if "intel" in cpu_name.lower() else cpu_generation >= 2
+            min_req_met = self.policy.passes("cpu", {"cpu_cores": cores, "cpu_ghz": freq, "cpu_supported": True})
+            generation_ok = cpu_class["supported"]
             
-            self.results["cpu"]["status"] = min_req_met and generation_ok
+            self.results["cpu"]["status"] = self.policy.passes(
+                "cpu", {"cpu_cores": cores, "cpu_ghz": freq, "cpu_supported": generation_ok})
             self.results["cpu"]["details"] = {
                 "name": cpu_name,
                 "cores": cores,
                 "frequency": f"{freq} GHz",
-                "generation": cpu_generation,
+                "generation": cpu_class["generation"],
+                "family": cpu_class["family"],
+                "cpu_database": cpu_database().version,
                 "architecture": cpu_info.get("architecture", ""),
                 "compatible_generation": generation_ok,
                 "meets_min_requirements": min_req_met
@@ -77,94 +2187,61 @@ class Win11Checker:
             self.results["cpu"]["details"]["error"] = str(e)
             
     def detect_cpu_generation(self, cpu_name):
-        cpu_name = cpu_name.lower()
-        
-        # Intel detection
-
-        if "intel" in cpu_name:
-            # Core i3/i5/i7/i9 detection
-
-            match = re.search(r'i[3579]-(\d{1,5})', cpu_name)
-            if match:
-                model = match.group(1)
-                # Extract generation from the first 1-2 model numbers
-
-                if len(model) >= 4:  # 10th gen and above (e.g. i7-1065G7)
-
-                    return int(model[0:2])
-                else:
-                    return int(model[0])
-        
-        # AMD detection
-
-        elif "amd" in cpu_name and "ryzen" in cpu_name:
-            # Ryzen detection
-
-            match = re.search(r'ryzen [^0-9]*(\d)', cpu_name)
-            if match:
-                return int(match.group(1))
-                
-        # Default: assume incompatible (generation 0)
-
-        return 0
+        return cpu_database().classify(cpu_name)["generation"]
             
     def get_cpu_info(self):
+        platform_info = self.backend.platform_info()
         info = {
-            "name": platform.processor(),
-            "architecture": platform.machine(),
+            "name": platform_info["processor"],
+            "architecture": platform_info["machine"],
             "cores": 0,
             "frequency": 0.0
         }
         
-        try:
-            # Ottieni nome CPU più dettagliato
-            output = subprocess.check_output("wmic cpu get name", shell=True).decode().strip().split('\n')
-            if len(output) >= 2:
-                info["name"] = output[1].strip()
-                
-            # Get Core Number
-
-            output = subprocess.check_output("wmic cpu get NumberOfCores", shell=True).decode().strip().split('\n')
-            if len(output) >= 2:
-                info["cores"] = int(output[1].strip())
-                
-            # Get Frequency
-
-            output = subprocess.check_output("wmic cpu get MaxClockSpeed", shell=True).decode().strip().split('\n')
-            if len(output) >= 2:
-                info["frequency"] = round(int(output[1].strip()) / 1000, 2)
-        except:
-            pass
+        cpu = self.fact("inventory")["cpu"]
+        if cpu["name"]:
+            info["name"] = cpu["name"]
+        info["cores"] = cpu["cores"]
+        info["frequency"] = round(cpu["max_clock_mhz"] / 1000, 2)
             
         return info
     
+    def collect_inventory(self):
+        """Collect the CPU, memory and disk inventory"""
+        try:
+            output = self.run_command(INVENTORY_COMMAND)
+        except:
+            tracer.swallowed()
+            output = ""
+        return parse_inventory(output)
+    
     def check_ram(self):
         try:
-            ram_gb = self.get_ram_size()
+            ram_gb = self.probe("ram")
             
-            self.results["ram"]["status"] = ram_gb >= 4
+            self.results["ram"]["status"] = self.policy.passes("ram", {"ram_gb": ram_gb})
             self.results["ram"]["details"] = {
                 "total": f"{ram_gb} GB",
-                "required": "4 GB"
+                "required": f"{self.policy.limit('ram', 'ram_gb')} GB"
             }
         except Exception as e:
             self.results["ram"]["details"]["error"] = str(e)
             
     def get_ram_size(self):
         try:
-            output = subprocess.check_output("wmic computersystem get totalphysicalmemory", shell=True).decode().strip().split("\n")[1]
-            return round(int(output) / (1024**3))
-        except:
-            return 0
+            total = self.backend.native("memory_status")["total_physical"]
+        except (NotImplementedError, OSError):
+            total = self.fact("inventory")["total_physical_memory"]
+        return round(total / (1024**3))
             
     def check_storage(self):
         try:
-            disk_info = self.get_disk_info()
+            disk_info = self.probe("storage")
             
-            self.results["storage"]["status"] = disk_info["largest_free_gb"] >= 64
+            self.results["storage"]["status"] = self.policy.passes("storage", {"free_gb": disk_info["largest_free_gb"]})
             self.results["storage"]["details"] = {
                 "free_space": f"{disk_info['largest_free_gb']} GB",
-                "required": "64 GB",
+                "required": f"{self.policy.limit('storage', 'free_gb')} GB",
                 "system_drive": disk_info["system_drive"],
                 "all_drives": disk_info["all_drives"]
             }
@@ -186,46 +2263,45 @@ class Win11Checker:
             
             # Check all available units
 
-            drives = subprocess.check_output("wmic logicaldisk get caption,freespace,size", shell=True).decode().split('\n')[1:]
+            try:
+                drives = self.backend.native("logical_disks")
+            except (NotImplementedError, OSError):
+                drives = self.fact("inventory")["logical_disks"]
+                
             for drive in drives:
-                parts = drive.split()
-                if len(parts) >= 3:
-                    try:
-                        drive_letter = parts[0].strip()
-                        free_space = int(parts[1].strip())
-                        total_size = int(parts[2].strip())
-                        
-                        free_gb = round(free_space / (1024**3))
-                        total_gb = round(total_size / (1024**3))
-                        
-                        info["all_drives"].append({
-                            "drive": drive_letter,
-                            "free_gb": free_gb,
-                            "total_gb": total_gb
-                        })
-                        
-                        if free_gb > info["largest_free_gb"]:
-                            info["largest_free_gb"] = free_gb
-                            
-                        # Specifically check the system drive
+                drive_letter = drive["caption"]
+                free_gb = round(drive["free_space"] / (1024**3))
+                total_gb = round(drive["size"] / (1024**3))
+                
+                info["all_drives"].append({
+                    "drive": drive_letter,
+                    "free_gb": free_gb,
+                    "total_gb": total_gb
+                })
+                
+                if free_gb > info["largest_free_gb"]:
+                    info["largest_free_gb"] = free_gb
+                    
+                # Specifically check the system drive
 
-                        if drive_letter == system_drive:
-                            info["system_drive_free_gb"] = free_gb
-                    except:
-                        pass
+                if drive_letter == system_drive:
+                    info["system_drive_free_gb"] = free_gb
         except:
-            pass
+            tracer.swallowed()
             
         return info
             
     def check_tpm(self):
         try:
-            tpm_version = self.get_tpm_status()
+            tpm_version = self.probe("tpm")
+            if tpm_version is None:
+                self.local.interrupted = getattr(self.local, "interrupted", None) or "The TPM could not be queried"
+                return
             
-            self.results["tpm"]["status"] = tpm_version >= 2.0
+            self.results["tpm"]["status"] = self.policy.passes("tpm", {"tpm_version": tpm_version})
             self.results["tpm"]["details"] = {
                 "version": tpm_version,
-                "required": "2.0"
+                "required": str(self.policy.limit("tpm", "tpm_version"))
             }
         except Exception as e:
             self.results["tpm"]["details"]["error"] = str(e)
@@ -233,31 +2309,22 @@ class Win11Checker:
     def get_tpm_status(self):
         """Rileva TPM usando i risultati della diagnosi"""
         try:
-            # TPM verification with wmic
-            output = subprocess.check_output("wmic /namespace:\\\\root\\CIMV2\\Security\\MicrosoftTpm path Win32_Tpm get * /format:list", shell=True).decode()
-            
-            if "SpecVersion" in output:
-                match = re.search(r'SpecVersion=([0-9\.]+)', output)
-                if match:
-                    version_str = match.group(1)
-                    if version_str.startswith("2."):
-                        return 2.0
-                    elif version_str.startswith("1."):
-                        return 1.2
-            
-            # Check if it's enabled
-            if "IsEnabled_InitialValue=TRUE" in output:
-                return 2.0  # We assume TPM 2.0 if it is enabled but we can't determine the version
+            # TPM verification with wmic. None when it failed, e.g. where wmic was removed
+
+            return parse_tpm_version(self.run_command(TPM_COMMAND))
         except:
-            pass
+            tracer.swallowed()
         
-        return 0.0
+        return None
             
     def check_secure_boot(self):
         try:
-            secure_boot = self.check_secure_boot_status()
+            secure_boot = self.probe("secure_boot")
+            if secure_boot is None:
+                self.local.interrupted = getattr(self.local, "interrupted", None) or "Secure Boot support could not be determined"
+                return
             
-            self.results["secure_boot"]["status"] = secure_boot
+            self.results["secure_boot"]["status"] = self.policy.passes("secure_boot", {"secure_boot": secure_boot})
             self.results["secure_boot"]["details"] = {
                 "enabled": secure_boot,
                 "required": True
@@ -266,140 +2333,148 @@ class Win11Checker:
             self.results["secure_boot"]["details"]["error"] = str(e)
             
     def check_secure_boot_status(self):
-        """Check Secure Boot by considering whether it is supported, not just whether it is enabled"""
+        """Check Secure Boot by considering whether it is supported, not just whether it is enabled.
+
+        None when the firmware type or partition style it depends on is unknown.
+        """
         try:
             # Check if it is enabled first
-            output = subprocess.check_output("reg query \"HKLM\\SYSTEM\\CurrentControlSet\\Control\\SecureBoot\\State\" /v UEFISecureBootEnabled", shell=True).decode()
-            if "0x1" in output:
+            if self.read_registry(SECURE_BOOT_KEY, "UEFISecureBootEnabled") == 1:
                 return True
             
             # If it's not enabled, check if it's supported (UEFI + GPT)
-            # Check UEFI
-            firmware_output = subprocess.check_output("powershell -Command \"(Get-ComputerInfo).BiosFirmwareType\"", shell=True).decode().strip()
-            is_uefi = "Uefi" in firmware_output
-            
-            # Check GPT
-            is_gpt = self.check_disk_partition_style()
-            
-            # If it's UEFI and GPT, Secure Boot is supported
-            if is_uefi and is_gpt:
-                return True
+
+            firmware_type = self.fact("firmware_type")
+            if firmware_type == "UEFI":
+                partition_style = self.fact("partition_style")
+                return None if partition_style is None else partition_style == "GPT"
+            return None if firmware_type is None else False
         except:
-            pass
-        
-        return False
+            tracer.swallowed()
         
+        return None
         
     def check_disk_partition_style(self):
-        """Check if the system disk is using GPT"""
+        """Check if the system disk is using GPT, None if diskpart could not tell"""
+        partition_style = self.fact("partition_style")
+        return None if partition_style is None else partition_style == "GPT"
+        
+    def get_partition_style(self):
+        """Partition style from diskpart: "GPT" when a disk uses GPT, "MBR" otherwise, None if unknown"""
         try:
-            script_file = "diskpart_script.txt"
-            with open(script_file, "w") as f:
-                f.write("list disk\nexit")
-            
-            output = subprocess.check_output(f"diskpart /s {script_file}", shell=True).decode()
-            os.remove(script_file)
-            
-            return "GPT" in output
+            disks = parse_diskpart_disks(self.run_command(DISKPART_COMMAND, script=DISKPART_SCRIPT))
         except:
-            pass
+            tracer.swallowed()
+            return None
+        if not disks:
+            return None
+        return "GPT" if any(disk["gpt"] for disk in disks) else "MBR"
         
-        return False
+    def get_firmware_type(self):
+        """Firmware type, "UEFI" or "BIOS", from the cheapest detector that knows it; None if unknown"""
+        for tier in self.FIRMWARE_TIERS:
+            firmware_type = self.firmware_type_from(tier)
+            if firmware_type is not None:
+                return firmware_type
+        return None
+        
+    def firmware_type_from(self, tier):
+        """Firmware type as reported by a single detector, None if it cannot tell"""
+        try:
+            if tier == "native":
+                value = self.backend.native("firmware_type")
+            elif tier == "registry":
+                # Written at boot by Windows 8 and later
+
+                value = self.read_registry(CONTROL_KEY, "PEFirmwareType")
+            else:
+                # Get-ComputerInfo collects hundreds of properties and takes seconds, last resort only
+
+                output = self.run_command(FIRMWARE_COMMAND)
+                value = {"uefi": 2, "bios": 1}.get(output.strip().lower())
+        except:
+            tracer.swallowed()
+            return None
+        return FIRMWARE_TYPES.get(value)
+        
+    def get_os_build_number(self):
+        """Build number of the installed Windows, e.g. "19045", None if unknown"""
+        try:
+            return self.read_registry(CURRENT_VERSION_KEY, "CurrentBuildNumber")
+        except:
+            tracer.swallowed()
+            return None
     
     def check_directx(self):
         try:
-            directx_info = self.get_directx_info()
+            directx_info = self.probe("directx")
             
-            # Requirements: DirectX 12 or higher and WDDM 2.0 or higher
+            # Requirements: by default DirectX 12 or higher and WDDM 2.0 or higher
 
-            dx12_ok = directx_info["directx_version"] >= 12
-            wddm_ok = directx_info["wddm_version"] >= 2.0
-            
-            self.results["directx"]["status"] = dx12_ok and wddm_ok
+            self.results["directx"]["status"] = self.policy.passes("directx", {
+                "directx_version": directx_info["directx_version"],
+                "wddm_version": directx_info["wddm_version"]
+            })
             self.results["directx"]["details"] = {
                 "directx_version": directx_info["directx_version"],
                 "wddm_version": directx_info["wddm_version"],
-                "required": "DirectX 12, WDDM 2.0"
+                "source": directx_info["source"],
+                "required": f"DirectX {self.policy.limit('directx', 'directx_version')}, "
+                            f"WDDM {self.policy.limit('directx', 'wddm_version')}"
             }
         except Exception as e:
             self.results["directx"]["details"]["error"] = str(e)
             
     def get_directx_info(self):
+        """Detect DirectX and WDDM from the registry, running dxdiag only as a last resort"""
         info = {
             "directx_version": 0,
-            "wddm_version": 0.0
+            "wddm_version": 0.0,
+            "source": "registry"
         }
         
         try:
-            # Verifica DirectX tramite dxdiag
-            with open("dxinfo.txt", "w") as f:
-                subprocess.call("dxdiag /t dxinfo.txt", shell=True)
-                
-            # Wait for the file to be generated
+            # d3d12.dll ships with every DirectX 12 capable Windows
 
-            import time
-            max_wait = 5
-            while max_wait > 0 and not os.path.exists("dxinfo.txt"):
-                time.sleep(1)
-                max_wait -= 1
+            if self.backend.file_exists(D3D12_PATH):
+                info["directx_version"] = 12
                 
-            if os.path.exists("dxinfo.txt"):
-                with open("dxinfo.txt", "r") as f:
-                    content = f.read()
-                    
-                    # Search for DirectX version
-
-                    dx_match = re.search(r'DirectX Version: DirectX (\d+)', content)
-                    if dx_match:
-                        info["directx_version"] = int(dx_match.group(1))
-                        
-                    # Search for WDDM version
-
-                    wddm_match = re.search(r'Driver Model: WDDM (\d+\.\d+)', content)
-                    if wddm_match:
-                        info["wddm_version"] = float(wddm_match.group(1))
-                
-                # Remove the temporary file
-
-                try:
-                    os.remove("dxinfo.txt")
-                except:
-                    pass
-                    
-            # If you couldn't get the information, try another method
+            # The display driver version encodes the WDDM version
 
-            if info["directx_version"] == 0:
-                # Check for d3d12.dll
-
-                if os.path.exists("C:\\Windows\\System32\\d3d12.dll"):
-                    info["directx_version"] = 12
-                    
-                # Check WDDM version in the registry
+            driver_versions = self.read_registry(DISPLAY_CLASS_KEY, "DriverVersion", subkeys=True)
+            info["wddm_version"] = max((wddm_from_driver_version(v) for v in driver_versions), default=0.0)
+            
+            # Without a driver version, fall back to the OS build
 
-                try:
-                    key_path = r'SOFTWARE\Microsoft\Windows NT\CurrentVersion'
-                    key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path)
-                    build = winreg.QueryValueEx(key, "CurrentBuildNumber")[0]
-                    
-                    # Windows 10/11 build 10586 or higher has WDDM 2.0+
+            if info["wddm_version"] == 0.0:
+                info["wddm_version"] = wddm_from_build(self.fact("os_build"))
+        except:
+            tracer.swallowed()
+            
+        if info["directx_version"] and info["wddm_version"]:
+            return info
+            
+        # Last resort: dxdiag, bounded by a deadline and cancelled with the scan
 
-                    if int(build) >= 10586:
-                        info["wddm_version"] = 2.0
-                except:
-                    pass
+        try:
+            report = self.run_command(DXDIAG_COMMAND, report_timeout=self.dxdiag_timeout)
+            dxdiag_info = parse_dxdiag_report(report)
+            if dxdiag_info["directx_version"]:
+                info.update(dxdiag_info, source="dxdiag")
         except:
-            pass
+            tracer.swallowed()
             
         return info
         
     def check_architecture(self):
         try:
-            arch = platform.machine()
-            is_64bit = platform.architecture()[0] == '64bit'
+            arch_info = self.probe("architecture")
+            arch = arch_info["architecture"]
+            is_64bit = arch_info["is_64bit"]
             
             # Windows 11 requires 64-bit
 
-            self.results["architecture"]["status"] = is_64bit
+            self.results["architecture"]["status"] = self.policy.passes("architecture", {"is_64bit": is_64bit})
             self.results["architecture"]["details"] = {
                 "architecture": arch,
                 "is_64bit": is_64bit,
@@ -408,12 +2483,29 @@ class Win11Checker:
         except Exception as e:
             self.results["architecture"]["details"]["error"] = str(e)
         
+    def get_architecture_info(self):
+        # The OS architecture, even when running under a 32-bit Python
+
+        try:
+            return self.backend.native("system_info")
+        except (NotImplementedError, OSError):
+            pass
+            
+        platform_info = self.backend.platform_info()
+        return {
+            "architecture": platform_info["machine"],
+            "is_64bit": platform_info["bits"] == '64bit'
+        }
+        
     def check_gpt(self):
         """Check if the system disk is using GPT"""
         try:
-            is_gpt = self.check_disk_partition_style()
+            is_gpt = self.probe("gpt")
+            if is_gpt is None:
+                self.local.interrupted = getattr(self.local, "interrupted", None) or "The partition style could not be read"
+                return
             
-            self.results["gpt"]["status"] = is_gpt
+            self.results["gpt"]["status"] = self.policy.passes("gpt", {"gpt": is_gpt})
             self.results["gpt"]["details"] = {
                 "is_gpt": is_gpt,
                 "required": "GPT partition required for UEFI/Secure Boot"
@@ -421,29 +2513,1043 @@ class Win11Checker:
         except Exception as e:
             self.results["gpt"]["details"]["error"] = str(e)
             
-    def run_all_checks(self):
-        self.check_cpu_compatibility()
-        self.check_ram()
-        self.check_storage()
-        self.check_tpm()
-        self.check_secure_boot()
-        self.check_gpt()  
-        self.check_directx()
-        self.check_architecture()
+    @classmethod
+    def from_raw(cls, raw, policy=None):
+        """Checker evaluating raw probe results collected elsewhere, e.g. by another host.
+
+        Nothing is probed on this machine: categories missing from raw are unknown.
+        """
+        checker = cls(FakeProbeBackend(outputs={}, registry={}, files=set(), platform={}), max_workers=1,
+                      cache=False, policy=policy)
+        checker.preset_results = raw
+        return checker
+        
+    def apply_policy(self, policy):
+        """Evaluate the raw results of the last run against another policy, without probing again"""
+        self.policy = policy if isinstance(policy, Policy) else load_policy(policy)
+        preset_results = self.preset_results
+        self.preset_results = dict(self.raw_results)
+        try:
+            return self.run_all_checks(max_workers=1)
+        finally:
+            self.preset_results = preset_results
+        
+    def probe(self, category):
+        """Return the raw facts of a category, from the cache while they are still valid"""
+        if self.preset_results is not None:
+            if category not in self.preset_results:
+                self.local.interrupted = "Not collected"
+                raise KeyError(category)
+            self.raw_results[category] = self.preset_results[category]
+            return self.preset_results[category]
+            
+        # Incremental runs keep the previous result while the inputs are unchanged.
+        # The change signals are read within the probe's deadline, and only
+        # when they are needed: for an incremental run or before a real probe
+
+        span = tracer.current()
+        self.local.deadline = time.monotonic() + self.probe_timeout if self.probe_timeout else None
+        if self.incremental and category in self.fingerprints and category in self.raw_results:
+            fingerprint = self.fingerprint(category, bounded=True)
+            if fingerprint is not None and self.fingerprints[category] == fingerprint:
+                self.reused.add(category)
+                if span is not None:
+                    span.set(source="reused")
+                return self.raw_results[category]
+        self.fingerprints.pop(category, None)
+            
+        if self.cache is not None and not self.force_refresh:
+            found, value = self.cache.get(category)
+            if found:
+                if self.is_current_run():
+                    self.raw_results[category] = value
+                if span is not None:
+                    span.set(source="cache")
+                return value
+                
+        fingerprint = self.fingerprint(category, bounded=True)
+        with tracer.span("probe", probe=self.PROBES[category]):
+            value = getattr(self, self.PROBES[category])()
+            
+        # A probe that outlived its run leaves the raw results of the current run alone
+
+        if not self.is_current_run():
+            return value
+        self.raw_results[category] = value
+        interrupted = getattr(self.local, "interrupted", None)
+        if not interrupted and probe_succeeded(category, value):
+            if self.cache is not None:
+                self.cache.put(category, value)
+            if fingerprint is not None:
+                self.fingerprints[category] = fingerprint
+        return value
+        
+    def fingerprint(self, category, signals=None, bounded=False):
+        """Change signals of a category's inputs, None when it has none.
+
+        bounded reads them within the current probe's deadline and cancel
+        event, otherwise each read gets probe_timeout.
+        """
+        names = self.FINGERPRINTS.get(category)
+        if not names:
+            return None
+        signals = signals or self.signals
+        if bounded:
+            bounds = {"timeout": self.remaining_time(), "cancel_event": self.cancel_event}
+        else:
+            bounds = {"timeout": self.probe_timeout or None}
+        values = [signals.get(name, lambda: read_change_signal(self.backend, name, **bounds)) for name in names]
+        if all(value is None for value in values):
+            return None
+        return values
+        
+    def fact(self, name):
+        """Return a fact shared by several probes, computed once per run.
+
+        When the command behind a fact timed out or was cancelled, every
+        category reading it is unknown, not just the first one.
+        """
+        def compute():
+            interrupted = getattr(self.local, "interrupted", None)
+            self.local.interrupted = None
+            try:
+                with tracer.span("fact", fact=name):
+                    return getattr(self, self.FACTS[name])(), self.local.interrupted
+            finally:
+                self.local.interrupted = interrupted
+                
+        value, interrupted = self.facts.get(name, compute)
+        if interrupted:
+            self.local.interrupted = interrupted
+        return value
+        
+    def remaining_time(self):
+        """Seconds left before the probe or run deadline, None without deadline"""
+        deadlines = [d for d in (getattr(self.local, "deadline", None), self.run_deadline) if d is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+        
+    def run_command(self, command, report_timeout=None, script=None):
+        """Run a probe command within the deadlines, killing it when the scan is cancelled.
+
+        With report_timeout the command writes a report file (see run_to_file),
+        bounded by report_timeout as well. With script the command reads a
+        script file (see run_script). A timed out or cancelled command marks
+        the current category as unknown.
+        """
+        timeout = self.remaining_time()
+        try:
+            if script is not None:
+                return self.backend.run_script(command, script, timeout=timeout, cancel_event=self.cancel_event)
+            if report_timeout is None:
+                return self.backend.run(command, timeout=timeout, cancel_event=self.cancel_event)
+            timeout = report_timeout if timeout is None else min(timeout, report_timeout)
+            return self.backend.run_to_file(command, timeout, cancel_event=self.cancel_event)
+        except subprocess.TimeoutExpired:
+            self.local.interrupted = f"Timed out after {timeout:.1f} s"
+            raise
+        except ProbeCancelled:
+            self.local.interrupted = "Cancelled" if self.cancelled else "Scan timed out"
+            raise
+            
+    def read_registry(self, key_path, name, subkeys=False):
+        """Read a registry value, or with subkeys the value of every direct subkey,
+        within the deadlines like run_command().
+        """
+        timeout = self.remaining_time()
+        read = self.backend.read_registry_subkey_values if subkeys else self.backend.read_registry_value
+        try:
+            return read(key_path, name, timeout=timeout, cancel_event=self.cancel_event)
+        except subprocess.TimeoutExpired:
+            self.local.interrupted = f"Timed out after {timeout:.1f} s"
+            raise
+        except ProbeCancelled:
+            self.local.interrupted = "Cancelled" if self.cancelled else "Scan timed out"
+            raise
+            
+    def cancel(self):
+        """Abort the running scan: running commands are killed, pending checks are skipped"""
+        self.cancelled = True
+        self.cancel_event.set()
+        
+    def mark_unknown(self, category, reason):
+        self.results[category] = {"status": False, "details": {"unknown": True, "error": reason}}
         
+    def check_chains(self):
+        """Group the checks into chains that can run independently of each other"""
+        chained = {category for chain in self.CHECK_CHAINS for category in chain}
+        chains = [(category,) for category in self.CHECKS if category not in chained]
+        return chains + list(self.CHECK_CHAINS)
+
+    def run_check_chain(self, chain, on_result=None, run_id=None):
+        """Run the checks of a chain in order, timing each of them.
+
+        on_result(category, result) is called from the worker thread as soon
+        as a check completes. Each check writes a result of its own, which is
+        only kept while run_id is still the current run and the category was
+        not reported as unknown in the meantime.
+        """
+        run_id = self.run_id if run_id is None else run_id
+        self.local.run_id = run_id
+        try:
+            for category in chain:
+                if run_id != self.run_id:
+                    return
+                start = time.perf_counter()
+                self.local.results = {category: {"status": False, "details": {}}}
+                try:
+                    self.run_check(category)
+                    result = self.local.results[category]
+                finally:
+                    self.local.results = None
+                with self.run_lock:
+                    if run_id != self.run_id or category in self.completed:
+                        return
+                    self.run_results[category] = result
+                    self.timings[category] = time.perf_counter() - start
+                    self.completed.add(category)
+                    if on_result is not None:
+                        on_result(category, result)
+        finally:
+            self.local.run_id = None
+
+    def run_check(self, category):
+        """Run the check of a category, marking it unknown when its probe was interrupted"""
+        with tracer.span("check", parent=self.scan_span, category=category) as span:
+            if self.run_deadline is not None and time.monotonic() > self.run_deadline:
+                self.cancel_event.set()
+            if self.cancel_event.is_set():
+                self.mark_unknown(category, "Cancelled" if self.cancelled else "Scan timed out")
+            else:
+                self.local.interrupted = None
+                getattr(self, self.CHECKS[category])()
+                if self.local.interrupted:
+                    self.mark_unknown(category, self.local.interrupted)
+            if span is not NULL_SPAN:
+                details = self.results[category]["details"]
+                span.set(status=self.results[category]["status"], unknown=details.get("unknown", False),
+                         error=details.get("error"))
+
+    def run_all_checks(self, max_workers=None, force_refresh=False, on_result=None, incremental=False,
+                       reset_cancel=True):
+        """Run every check, independent ones in parallel on a bounded thread pool.
+
+        With force_refresh every probe runs again, ignoring the cached results.
+        With incremental, the results of the previous run are kept for the
+        categories whose fingerprint did not change. on_result(category, result)
+        is called as soon as each check completes. Without reset_cancel a
+        cancel() made before the call, e.g. during the prefetch of
+        run_all_checks_async(), still applies.
+        """
+        max_workers = max_workers or self.max_workers
+        self.force_refresh = force_refresh
+        self.incremental = incremental
+        chains = self.check_chains()
+        start = time.perf_counter()
+        self.facts = FactStore()
+        self.signals = FactStore()
+        self.reused = set()
+        with self.run_lock:
+            self.run_id += 1
+            self.completed = set()
+        run_id = self.run_id
+        if reset_cancel:
+            self.cancelled = False
+            self.cancel_event.clear()
+        self.run_deadline = time.monotonic() + self.run_timeout if self.run_timeout else None
+        
+        with tracer.span("scan", policy=self.policy.name, incremental=incremental) as self.scan_span:
+            if max_workers <= 1:
+                for chain in chains:
+                    self.run_check_chain(chain, on_result, run_id)
+            else:
+                from concurrent.futures import ThreadPoolExecutor, wait
+                
+                pool = ThreadPoolExecutor(max_workers=min(max_workers, len(chains)))
+                futures = [pool.submit(self.run_check_chain, chain, on_result, run_id) for chain in chains]
+                _, pending = wait(futures, timeout=None if self.run_deadline is None else self.remaining_time())
+                if pending:
+                    # Out of time: kill the running commands and give the probes a moment to report
+
+                    self.cancel_event.set()
+                    wait(pending, timeout=self.ABORT_GRACE)
+                pool.shutdown(wait=False, cancel_futures=True)
+                
+                # Checks stuck outside of a command cannot be interrupted, report them as
+                # unknown. Whatever they return later is dropped by run_check_chain
+
+                with self.run_lock:
+                    for category in self.CHECKS:
+                        if category not in self.completed:
+                            self.mark_unknown(category, "Cancelled" if self.cancelled else "Scan timed out")
+                            self.completed.add(category)
+                            if on_result is not None:
+                                on_result(category, self.results[category])
+                            
+                    # Close the run, so that the checks still running count as stragglers
+
+                    self.run_id += 1
+                        
+            if self.cache is not None:
+                self.cache.save()
+            self.timings["total"] = time.perf_counter() - start
+            self.scan_span.set(compatible=all(self.results[check]["status"] for check in self.policy.essential),
+                               reused=sorted(self.reused), cancelled=self.cancelled)
+            
         # Calculate the overall result
-        essential_checks = ["cpu", "ram", "storage", "tpm", "secure_boot", "gpt", "architecture"]
-        essential_passed = all(self.results[check]["status"] for check in essential_checks)
+        essential_passed = all(self.results[check]["status"] for check in self.policy.essential)
         
-        return {
+        self.last_result = {
             "compatible": essential_passed,
-            "details": self.results,
+            "details": dict(self.results),
             "summary": {
                 "essential_requirements_met": essential_passed,
                 "total_passed": sum(1 for r in self.results.values() if r["status"]),
-                "total_checks": len(self.results)
+                "total_checks": len(self.results),
+                "unknown_checks": [c for c, r in self.results.items() if r["details"].get("unknown")],
+                "cancelled": self.cancelled,
+                "reused_checks": sorted(self.reused),
+                "policy": self.policy.name
             }
         }
+        return self.last_result
+        
+    def export_results(self, filename, format=None, compression=None, append=False, host=None):
+        """Export the last results with the raw probe data, see write_exports().
+
+        The format (json, ndjson or csv) and the compression (gzip or zstd)
+        follow the file extension unless given, e.g. results.ndjson.gz.
+        Returns the absolute path of the file.
+        """
+        if self.last_result is None:
+            raise ValueError("There are no results to export yet, run the checks first")
+        document = export_document(self.last_result, self.raw_results, host)
+        return write_exports(filename, [document], format, compression, append)
+        
+    async def run_all_checks_async(self, max_workers=None, force_refresh=False, on_result=None, incremental=False):
+        """Awaitable run_all_checks for an asyncio event loop, e.g. a management agent.
+
+        With an AsyncProbeBackend the commands of the categories to probe are
+        started together as asyncio subprocesses first; the checks then run
+        on a worker thread so that the loop stays free.
+        """
+        import asyncio
+        
+        # The cancel state is reset once, here: a cancel() during the prefetch must reach the checks
+
+        self.cancelled = False
+        self.cancel_event.clear()
+        if isinstance(self.backend, AsyncProbeBackend):
+            self.signals = FactStore()
+            commands = {}
+            for category, category_commands in self.PREFETCH.items():
+                if self.needs_probe(category, force_refresh, incremental):
+                    commands.update(category_commands)
+            await self.backend.prefetch(commands, self.probe_timeout, self.cancel_event)
+        try:
+            if self.cancelled:
+                # Nothing is probed, every check is reported as cancelled right away
+
+                return self.run_all_checks(1, force_refresh, on_result, incremental, reset_cancel=False)
+            return await asyncio.to_thread(self.run_all_checks, max_workers, force_refresh, on_result, incremental,
+                                           False)
+        finally:
+            if isinstance(self.backend, AsyncProbeBackend):
+                self.backend.prefetched = {}
+                
+    def changed_categories(self):
+        """Categories whose inputs changed since they were last probed, read outside of any run"""
+        signals = FactStore()
+        return [
+            category for category, fingerprint in list(self.fingerprints.items())
+            if self.fingerprint(category, signals) != fingerprint
+        ]
+        
+    def needs_probe(self, category, force_refresh=False, incremental=False):
+        """Whether the next run probes a category, rather than taking it from the cache or the last run"""
+        if self.preset_results is not None:
+            return False
+        if incremental and category in self.fingerprints and category in self.raw_results:
+            fingerprint = self.fingerprint(category)
+            if fingerprint is not None and self.fingerprints.get(category) == fingerprint:
+                return False
+        if self.cache is not None and not force_refresh:
+            return not self.cache.get(category)[0]
+        return True
+
+
+# Export file extensions
+
+EXPORT_FORMATS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+EXPORT_COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+# Columns of the CSV exports: one row per host, each category as pass, fail or unknown
+
+EXPORT_CSV_FIELDS = ["host", "exported_at", "compatible", "policy"] + list(Win11Checker.CHECKS) + ["raw"]
+
+
+def export_format(filename, format=None, compression=None):
+    """Format and compression of an export file, from its extension unless given"""
+    base, extension = os.path.splitext(filename.lower())
+    if extension in EXPORT_COMPRESSIONS:
+        compression = compression or EXPORT_COMPRESSIONS[extension]
+        extension = os.path.splitext(base)[1]
+    format = format or EXPORT_FORMATS.get(extension, "json")
+    if format not in ("json", "ndjson", "csv"):
+        raise ValueError(f"Unknown export format: {format}")
+    if compression not in (None, "gzip", "zstd"):
+        raise ValueError(f"Unknown compression: {compression}")
+    return format, compression
+
+
+def check_export_target(filename, format=None, compression=None, append=False):
+    """Format and compression of an export file, ValueError when it cannot be written that way.
+
+    Run before a scan, so that a wrong target fails before anything is probed.
+    """
+    format, compression = export_format(filename, format, compression)
+    if append and format == "json":
+        raise ValueError("A JSON export cannot be appended to, use NDJSON or CSV")
+    if compression == "zstd":
+        load_zstd()
+    folder = os.path.dirname(os.path.abspath(filename))
+    if not os.path.isdir(folder):
+        raise ValueError(f"The export folder does not exist: {folder}")
+    return format, compression
+
+
+def export_document(result, raw, host=None):
+    """Export record of one host: its results plus the raw probe data.
+
+    The "host" and "raw" keys are those of the batch inventories, so an
+    NDJSON export or archive can be evaluated again with the batch command.
+    """
+    import datetime
+    
+    return {
+        "host": host or platform.node(),
+        "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "compatible": result["compatible"],
+        "summary": result["summary"],
+        "details": result["details"],
+        "raw": raw
+    }
+
+
+def export_csv_row(document):
+    details = document["details"]
+    row = {
+        "host": document["host"],
+        "exported_at": document["exported_at"],
+        "compatible": document["compatible"],
+        "policy": document["summary"].get("policy"),
+        "raw": json.dumps(document["raw"], default=str)
+    }
+    for category in Win11Checker.CHECKS:
+        result = details.get(category, {})
+        row[category] = "unknown" if result.get("details", {}).get("unknown") else "pass" if result.get("status") else "fail"
+    return row
+
+
+def load_zstd():
+    """zstd module of Python 3.14, else the zstandard package; ValueError without either"""
+    try:
+        from compression import zstd
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise ValueError("zstd compression needs Python 3.14 or the zstandard package")
+
+
+def compressed_writer(raw, compression):
+    """Binary file object compressing into raw; closing it leaves raw open"""
+    if compression == "gzip":
+        import gzip
+        return gzip.GzipFile(fileobj=raw, mode="wb")
+    if compression == "zstd":
+        zstd = load_zstd()
+        if hasattr(zstd, "ZstdFile"):
+            return zstd.ZstdFile(raw, "wb")
+        return zstd.ZstdCompressor().stream_writer(raw, closefd=False)
+    return None
+
+
+def open_export(path):
+    """Open an export, archive or inventory for reading as text, decompressing it by extension.
+
+    Concatenated gzip members and zstd frames, as written by appends, are read as one stream.
+    """
+    import io
+    
+    _, compression = export_format(path)
+    if compression == "gzip":
+        import gzip
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    if compression == "zstd":
+        zstd = load_zstd()
+        if hasattr(zstd, "ZstdFile"):
+            return io.TextIOWrapper(zstd.ZstdFile(path, "rb"), encoding="utf-8", newline="")
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstd.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True),
+                                encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def write_exports(filename, documents, format=None, compression=None, append=False):
+    """Stream export documents to filename and return its absolute path.
+
+    A new export is written to a temporary file next to filename, then renamed
+    over it, so readers never see a partial file. With append the records are
+    added to an existing NDJSON or CSV archive, without reading it; compressed
+    archives get one more gzip member or zstd frame.
+    """
+    import csv
+    import io
+    import tempfile
+    
+    format, compression = check_export_target(filename, format, compression, append)
+    filename = os.path.abspath(filename)
+    header = not append or not os.path.exists(filename) or os.path.getsize(filename) == 0
+    
+    if append:
+        raw = open(filename, "ab")
+        temp_path = None
+    else:
+        fd, temp_path = tempfile.mkstemp(prefix=".export_", suffix=".tmp", dir=os.path.dirname(filename))
+        raw = os.fdopen(fd, "wb")
+        
+        # mkstemp creates the file private, keep the mode of the file it replaces
+
+        if os.name != "nt":
+            os.chmod(temp_path, os.stat(filename).st_mode & 0o777 if os.path.exists(filename) else 0o644)
+    try:
+        writer = compressed_writer(raw, compression)
+        stream = io.TextIOWrapper(writer or raw, encoding="utf-8", newline="", write_through=True)
+        if format == "csv":
+            rows = csv.DictWriter(stream, fieldnames=EXPORT_CSV_FIELDS)
+            if header:
+                rows.writeheader()
+            for document in documents:
+                rows.writerow(export_csv_row(document))
+        elif format == "ndjson":
+            for document in documents:
+                stream.write(json.dumps(document, default=str) + "\n")
+        else:
+            documents = list(documents)
+            json.dump(documents[0] if len(documents) == 1 else documents, stream, indent=2, default=str)
+            stream.write("\n")
+        stream.flush()
+        stream.detach()
+        if writer is not None:
+            writer.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+        raw.close()
+        if temp_path is not None:
+            os.replace(temp_path, filename)
+    except BaseException:
+        raw.close()
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        raise
+    return filename
+
+
+def benchmark_check_engine(latency=0.2, max_workers=4):
+    """Compare a serial and a parallel run against FakeProbeBackend"""
+    timings = {}
+    for label, workers in (("serial", 1), ("parallel", max_workers)):
+        checker = Win11Checker(FakeProbeBackend(latency=latency), max_workers=workers, cache=False)
+        checker.run_all_checks()
+        timings[label] = checker.timings["total"]
+        
+    timings["speedup"] = timings["serial"] / timings["parallel"]
+    return timings
+
+
+def benchmark_pipeline(backend=None, iterations=1000, profile=False):
+    """Run the whole run_all_checks pipeline repeatedly against recorded data.
+
+    The checks run serially and without cache, so only the parsing and
+    evaluation logic is measured. With profile the report also holds the
+    top cProfile entries.
+    """
+    checker = Win11Checker(backend or FakeProbeBackend(), max_workers=1, cache=False)
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        
+    start = time.perf_counter()
+    for _ in range(iterations):
+        checker.run_all_checks()
+    elapsed = time.perf_counter() - start
+    
+    report = {
+        "iterations": iterations,
+        "seconds": round(elapsed, 4),
+        "runs_per_second": round(iterations / elapsed, 1)
+    }
+    if profiler is not None:
+        import io
+        import pstats
+        
+        profiler.disable()
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(20)
+        report["profile"] = text.getvalue()
+    return report
+
+
+def benchmark_firmware_detection(backend=None, runs=3):
+    """Time every firmware type detector on its own.
+
+    Each tier reports the firmware type it found and its best time in
+    milliseconds. Against a replayed fixture the times recorded on the
+    original machine are reported instead, when the fixture has them.
+    """
+    backend = backend or NativeProbeBackend()
+    recorded = getattr(backend, "durations", {})
+    duration_keys = {
+        "native": "native:firmware_type",
+        "registry": f"registry:{CONTROL_KEY}\\PEFirmwareType",
+        "command": "run:" + FIRMWARE_COMMAND
+    }
+    checker = Win11Checker(backend, cache=False)
+    report = {}
+    for tier in Win11Checker.FIRMWARE_TIERS:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            firmware_type = checker.firmware_type_from(tier)
+            times.append(time.perf_counter() - start)
+        report[tier] = {"firmware_type": firmware_type, "ms": round(min(times) * 1000, 3), "timing": "measured"}
+        if duration_keys[tier] in recorded:
+            report[tier].update(ms=round(recorded[duration_keys[tier]] * 1000, 3), timing="recorded")
+    return report
+
+
+def generate_cpu_names(count, seed=0):
+    """Return count distinct CPU names, as the OS reports them, across the families of the database"""
+    import random
+    
+    rng = random.Random(seed)
+    templates = [
+        lambda: f"Intel(R) Core(TM) i{rng.choice('3579')}-{rng.randint(2, 9)}{rng.randint(100, 999)}"
+                f"{rng.choice(['', 'K', 'T', 'U', 'HQ'])} CPU @ {rng.uniform(1, 5):.2f}GHz",
+        lambda: f"{rng.randint(10, 14)}th Gen Intel(R) Core(TM) i{rng.choice('3579')}-{rng.randint(10, 14)}"
+                f"{rng.randint(100, 999)}{rng.choice(['', 'K', 'H', 'G7', 'U'])} @ {rng.uniform(1, 5):.2f}GHz",
+        lambda: f"Intel(R) Core(TM) Ultra {rng.choice('579')} {rng.randint(1, 2)}{rng.randint(10, 99)}"
+                f"{rng.choice('HUV')}",
+        lambda: f"Intel(R) Xeon(R) {rng.choice(['Silver', 'Gold', 'Platinum'])} {rng.choice('4568')}"
+                f"{rng.randint(1, 4)}{rng.randint(10, 99)} CPU @ {rng.uniform(1, 4):.2f}GHz",
+        lambda: f"Intel(R) Celeron(R) {rng.choice(['N', 'J', 'G'])}{rng.choice('3456')}{rng.randint(0, 9)}"
+                f"{rng.randint(10, 99)} CPU @ {rng.uniform(1, 4):.2f}GHz",
+        lambda: f"Intel(R) Pentium(R) Gold G{rng.choice('4567')}{rng.randint(4, 6)}{rng.randint(0, 9)}0"
+                f" CPU @ {rng.uniform(2, 4):.2f}GHz",
+        lambda: f"AMD Ryzen {rng.choice('3579')} {rng.choice(['', 'PRO '])}{rng.randint(1, 9)}"
+                f"{rng.randint(1, 9)}{rng.randint(0, 9)}0{rng.choice(['', 'X', 'H', 'U', 'HS'])}"
+                f" {rng.choice([4, 6, 8, 12, 16])}-Core Processor",
+        lambda: f"AMD Ryzen Threadripper {rng.randint(1, 7)}9{rng.randint(2, 9)}{rng.choice(['0X', '0WX'])}"
+                f" {rng.choice([16, 24, 32, 64])}-Core Processor",
+        lambda: f"AMD EPYC {rng.choice('4579')}{rng.randint(1, 9)}{rng.randint(1, 9)}{rng.randint(1, 4)}"
+                f" {rng.choice([8, 16, 32, 64])}-Core Processor"
+    ]
+    names = set()
+    while len(names) < count:
+        names.add(rng.choice(templates)())
+    return sorted(names)
+
+
+def benchmark_cpu_classification(count=1000000, names=None, distinct=10000, seed=0):
+    """Time the CPU database on distinct names, then on count names drawn from them, from a cold database.
+
+    The lookups of the distinct names measure the patterns alone; the run
+    over count names, as a fleet would repeat them, reports how much of its
+    rate comes from the memo through memo_hit_rate.
+    """
+    import random
+    
+    global compiled_cpu_database
+    
+    names = names or generate_cpu_names(distinct, seed)
+    compiled_cpu_database = None
+    database = cpu_database()
+    start = time.perf_counter()
+    for name in names:
+        database.lookup(name)
+    lookup_seconds = time.perf_counter() - start
+    
+    rng = random.Random(seed)
+    drawn = [rng.choice(names) for _ in range(count)]
+    compiled_cpu_database = None
+    start = time.perf_counter()
+    database = cpu_database()
+    supported = 0
+    misses = 0
+    for name in drawn:
+        misses += name not in database.memo
+        supported += database.classify(name)["supported"]
+    elapsed = time.perf_counter() - start
+    return {
+        "names": count,
+        "distinct_names": len(names),
+        "supported": supported,
+        "lookup_seconds": round(lookup_seconds, 4),
+        "lookups_per_second": round(len(names) / lookup_seconds),
+        "seconds": round(elapsed, 4),
+        "names_per_second": round(count / elapsed),
+        "memo_hit_rate": round(1 - misses / count, 4) if count else 0.0,
+        "database": database.version
+    }
+
+
+# Parsers exercised by bench-parsers and fuzz-parsers
+
+PARSERS = {
+    "wmi_list": parse_wmi_list,
+    "wmi_csv": parse_wmi_csv,
+    "inventory": parse_inventory,
+    "tpm": parse_tpm_version,
+    "reg_query": parse_reg_query,
+    "diskpart": parse_diskpart_disks
+}
+
+# Seed corpus of raw outputs, as the tools print them, with what the parser
+# must make of them: CRLF, wmic's \r\r\n, UTF-16 reports, OEM code pages and
+# localized diskpart and reg output
+
+PARSER_CORPUS = [
+    ("inventory", SAMPLE_OUTPUTS[INVENTORY_COMMAND].encode(), parse_inventory(SAMPLE_OUTPUTS[INVENTORY_COMMAND])),
+    ("tpm", SAMPLE_OUTPUTS[TPM_COMMAND].encode(), 2.0),
+    ("tpm", b"\r\r\n\r\r\nIsActivated_InitialValue=TRUE\r\r\nIsEnabled_InitialValue=TRUE\r\r\n"
+            b"SpecVersion=1.2, 2, 3\r\r\n\r\r\n\r\r\n", 1.2),
+    ("tpm", "\r\n\r\nIsEnabled_InitialValue=TRUE\r\nSpecVersion=\r\n\r\n".encode("utf-16"), 2.0),
+    ("tpm", b"No Instance(s) Available.\r\r\n", 0.0),
+    ("wmi_list", b"\r\r\n\r\r\nCaption=C:\r\r\nFreeSpace=1024\r\r\n\r\r\n\r\r\nCaption=D:\r\r\nFreeSpace=\r\r\n",
+     [(None, {"Caption": "C:", "FreeSpace": 1024}), (None, {"Caption": "D:", "FreeSpace": None})]),
+    ("wmi_csv", b"\r\r\nNode,Caption,FreeSpace,Size\r\r\nPC,C:,1024,4096\r\r\nPC,D:,,\r\r\n",
+     [{"Node": "PC", "Caption": "C:", "FreeSpace": 1024, "Size": 4096},
+      {"Node": "PC", "Caption": "D:", "FreeSpace": None, "Size": None}]),
+    ("reg_query", b"\r\nHKEY_LOCAL_MACHINE\\SYSTEM\\CurrentControlSet\\Control\\SecureBoot\\State\r\n"
+                  b"    UEFISecureBootEnabled    REG_DWORD    0x1\r\n\r\n",
+     {SECURE_BOOT_KEY: {"UEFISecureBootEnabled": 1}}),
+    ("reg_query", ("\r\nHKEY_LOCAL_MACHINE\\" + DISPLAY_CLASS_KEY + "\\0000\r\n"
+                   "    DriverVersion    REG_SZ    27.20.100.8681\r\n    DriverDesc    REG_SZ    Intel(R) UHD Graphics 630\r\n\r\n"
+                   "HKEY_LOCAL_MACHINE\\" + DISPLAY_CLASS_KEY + "\\0001\r\n"
+                   "    UpperFilters    REG_MULTI_SZ    a\\0b\r\n\r\n"
+                   "Suche beendet: 1 Übereinstimmung(en) gefunden.\r\n").encode("cp850"),
+     {DISPLAY_CLASS_KEY + "\\0000": {"DriverVersion": "27.20.100.8681", "DriverDesc": "Intel(R) UHD Graphics 630"},
+      DISPLAY_CLASS_KEY + "\\0001": {"UpperFilters": ["a", "b"]}}),
+    ("diskpart", SAMPLE_OUTPUTS[DISKPART_COMMAND].encode(),
+     [{"disk": 0, "gpt": True, "status": "Online", "size": 476 * 1024 ** 3, "free": 0, "dynamic": False}]),
+    ("diskpart", ("\r\nMicrosoft DiskPart-Version 10.0.19041.964\r\n\r\n"
+                  "  Datenträger ###  Status         Größe    Frei     Dyn  GPT\r\n"
+                  "  ---------------  -------------  -------  -------  ---  ---\r\n"
+                  "* Datenträger 0    Online          476 GB  1024 KB        *\r\n"
+                  "  Datenträger 1    Kein Medium        0 B      0 B\r\n\r\n"
+                  "DiskPart wird beendet...\r\n").encode("cp850"),
+     [{"disk": 0, "gpt": True, "status": "Online", "size": 476 * 1024 ** 3, "free": 1024 ** 2, "dynamic": False},
+      {"disk": 1, "gpt": False, "status": "Kein Medium", "size": 0, "free": 0, "dynamic": False}]),
+    ("diskpart", ("  N° disque  Statut         Taille   Libre    Dyn  GPT\r\n"
+                  "  ---------  -------------  -------  -------  ---  ---\r\n"
+                  "  Disque 0   En ligne        238 Go  1024 Ko   *    *\r\n").encode("cp850"),
+     [{"disk": 0, "gpt": True, "status": "En ligne", "size": 238 * 1024 ** 3, "free": 1024 ** 2, "dynamic": True}])
+]
+
+
+def benchmark_parsers(iterations=10000):
+    """Time decode_output() plus the parser on every corpus entry, in microseconds per output"""
+    report = {}
+    for name, parser in PARSERS.items():
+        samples = [data for parser_name, data, _ in PARSER_CORPUS if parser_name == name]
+        size = sum(len(data) for data in samples)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for data in samples:
+                parser(decode_output(data))
+        elapsed = time.perf_counter() - start
+        report[name] = {
+            "outputs": len(samples),
+            "us": round(elapsed / (iterations * len(samples)) * 1e6, 2),
+            "mb_per_second": round(size * iterations / elapsed / 1e6, 1)
+        }
+    return report
+
+
+def mutate_output(rng, data):
+    """Random variant of a raw output: bytes flipped, cut, repeated or replaced by separators"""
+    data = bytearray(data)
+    for _ in range(rng.randint(1, 4)):
+        index = rng.randrange(len(data) + 1)
+        operation = rng.randrange(5)
+        if operation == 0 and data:
+            data[min(index, len(data) - 1)] = rng.randrange(256)
+        elif operation == 1:
+            del data[index:index + rng.randint(1, 16)]
+        elif operation == 2:
+            data[index:index] = data[index:index + rng.randint(1, 32)]
+        elif operation == 3:
+            data[index:index] = rng.choice([b"\r", b"\n", b"\r\r\n", b"\0", b"=", b"[", b"]", b"-", b"*", b",",
+                                            b"    ", b"    REG_DWORD    ", b"HKEY_", b"\xff\xfe", b"\xc3"])
+        else:
+            del data[index:]
+    return bytes(data)
+
+
+def fuzz_parsers(iterations=100000, seed=0, corpus_dir=None):
+    """Check the parsers against the seed corpus, then feed them random variants of it.
+
+    A parser may return nothing useful for garbage but must not raise. Inputs
+    that make one raise are reported and, with corpus_dir, saved there as
+    <parser>-<sha1>.bin; the files already there are replayed first.
+    """
+    import hashlib
+    import random
+    
+    rng = random.Random(seed)
+    mismatches = [
+        {"parser": name, "input": data.decode("latin-1")}
+        for name, data, expected in PARSER_CORPUS if PARSERS[name](decode_output(data)) != expected
+    ]
+    
+    inputs = []
+    if corpus_dir:
+        os.makedirs(corpus_dir, exist_ok=True)
+        for file_name in sorted(os.listdir(corpus_dir)):
+            name = file_name.split("-", 1)[0]
+            if name in PARSERS and file_name.endswith(".bin"):
+                with open(os.path.join(corpus_dir, file_name), "rb") as f:
+                    inputs.append((name, f.read()))
+    replayed = len(inputs)
+    
+    crashes = {}
+    for index in range(replayed + iterations):
+        if index < replayed:
+            name, data = inputs[index]
+        else:
+            name, data, _ = rng.choice(PARSER_CORPUS)
+            data = mutate_output(rng, data)
+        try:
+            PARSERS[name](decode_output(data))
+        except Exception as e:
+            key = f"{name}-{hashlib.sha1(data).hexdigest()}"
+            if key not in crashes:
+                crashes[key] = {"parser": name, "error": f"{type(e).__name__}: {e}", "input": data.decode("latin-1")}
+                if corpus_dir:
+                    with open(os.path.join(corpus_dir, key + ".bin"), "wb") as f:
+                        f.write(data)
+    return {
+        "corpus": len(PARSER_CORPUS),
+        "mismatches": mismatches,
+        "replayed": replayed,
+        "iterations": iterations,
+        "crashes": len(crashes),
+        "examples": list(crashes.values())[:10],
+        "passed": not mismatches and not crashes
+    }
+
+
+BENCHMARK_PERCENTILES = (50, 90, 99)
+BENCHMARK_METRICS = ("wall_ms", "cpu_ms", "child_ms")
+
+
+def percentile(values, q):
+    """Linearly interpolated q-th percentile of a non-empty list"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarise_samples(samples):
+    """Min, mean, percentiles and max of a list of milliseconds"""
+    summary = {"min": round(min(samples), 3), "mean": round(sum(samples) / len(samples), 3)}
+    for q in BENCHMARK_PERCENTILES:
+        summary[f"p{q}"] = round(percentile(samples, q), 3)
+    summary["max"] = round(max(samples), 3)
+    return summary
+
+
+def benchmark_probes(backend=None, runs=20, warmup=3, policy=None):
+    """Time every check of run_all_checks over several runs, after warm-up runs.
+
+    The checks run serially in this thread, so each one is charged the wall
+    time, the CPU time of the thread and the CPU time of the child processes
+    reaped since the previous check completed. Child times are only reported
+    by the OS on POSIX; on Windows they stay 0.
+    """
+    import platform
+    
+    backend = backend or FakeProbeBackend()
+    checker = Win11Checker(backend, max_workers=1, cache=False, policy=policy)
+    samples = {category: {metric: [] for metric in BENCHMARK_METRICS} for category in Win11Checker.CHECKS}
+    samples["total"] = {metric: [] for metric in BENCHMARK_METRICS}
+    
+    def snapshot():
+        times = os.times()
+        return time.perf_counter(), time.thread_time(), times.children_user + times.children_system
+        
+    def record(category, first, last):
+        for metric, begin, end in zip(BENCHMARK_METRICS, first, last):
+            samples[category][metric].append((end - begin) * 1000)
+            
+    for index in range(warmup + runs):
+        measured = index >= warmup
+        marks = [snapshot()]
+        
+        def on_result(category, result):
+            marks.append(snapshot())
+            if measured:
+                record(category, marks[-2], marks[-1])
+                
+        checker.run_all_checks(force_refresh=True, on_result=on_result)
+        if measured:
+            record("total", marks[0], snapshot())
+            
+    return {
+        "version": 1,
+        "backend": type(backend).__name__,
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "runs": runs,
+        "warmup": warmup,
+        "policy": checker.policy.name,
+        "checks": {
+            category: {metric: summarise_samples(values) for metric, values in metrics.items()}
+            for category, metrics in samples.items()
+        }
+    }
+
+
+def diff_benchmark_reports(baseline, current, threshold=0.1, statistic="p50", min_ms=0.05):
+    """Compare two benchmark_probes reports check by check.
+
+    A metric regresses when its statistic grew by more than threshold (a
+    fraction) and by more than min_ms, which keeps sub-millisecond noise out.
+    """
+    checks = {}
+    regressions = []
+    for category, metrics in current["checks"].items():
+        if category not in baseline["checks"]:
+            continue
+        checks[category] = {}
+        for metric, summary in metrics.items():
+            before = baseline["checks"][category].get(metric, {}).get(statistic)
+            after = summary.get(statistic)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            regressed = after - before > min_ms and after > before * (1 + threshold)
+            checks[category][metric] = {"baseline": before, "current": after, "change": round(change, 4)}
+            if regressed:
+                regressions.append(f"{category}.{metric}")
+                
+    return {
+        "statistic": statistic,
+        "threshold": threshold,
+        "checks": checks,
+        "regressions": regressions,
+        "passed": not regressions
+    }
+
+
+# Modules that importing the checker must not load
+
+HEAVY_IMPORTS = ("tkinter", "PIL", "ctypes", "winreg", "concurrent.futures", "argparse", "tempfile", "webbrowser", "numpy")
+
+# Child process for benchmark_import_time: winreg is stubbed on other OSes so
+# that an accidental import is still recorded instead of failing
+
+IMPORT_BENCHMARK_CODE = """
+import importlib.abc, importlib.util, json, sys, types
+class WindowsStub(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, name, path, target=None):
+        if name == "winreg" and sys.platform != "win32":
+            return importlib.util.spec_from_loader(name, self)
+    def create_module(self, spec):
+        return types.ModuleType(spec.name)
+    def exec_module(self, module):
+        pass
+sys.meta_path.insert(0, WindowsStub())
+before = set(sys.modules)
+import CompCheckWin11
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+
+def benchmark_import_time(max_ms=50.0, runs=5):
+    """Measure the import cost of the checker in fresh interpreters with -X importtime.
+
+    Returns a report with the median cumulative import time and the heavy
+    modules that were loaded; "passed" is False if either is over budget.
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    command = [sys.executable, "-X", "importtime", "-c", IMPORT_BENCHMARK_CODE]
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    
+    # The first run compiles the module and is not measured
+
+    subprocess.run(command, cwd=cwd, env=env, capture_output=True, check=True)
+    
+    samples = []
+    loaded = set()
+    for _ in range(runs):
+        child = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True, check=True)
+        loaded.update(json.loads(child.stdout))
+        for line in child.stderr.splitlines():
+            if line.startswith("import time:") and line.endswith("| CompCheckWin11"):
+                samples.append(int(line.split("|")[1]) / 1000)
+                
+    samples.sort()
+    median_ms = samples[len(samples) // 2]
+    heavy = sorted(name for name in loaded if name in HEAVY_IMPORTS or name.split(".")[0] in HEAVY_IMPORTS)
+    return {
+        "median_ms": round(median_ms, 2),
+        "max_ms": max_ms,
+        "heavy_imports": heavy,
+        "passed": median_ms <= max_ms and not heavy
+    }
+
+
+class TkAsyncioBridge:
+    """Runs the asyncio event loop of the Tk window on a thread of its own.
+
+    The loop runs for as long as the window, so the commands that probes
+    start from worker threads always land on it. Coroutines report back to
+    the window through queues that Tk drains, they never touch the widgets.
+    """
+
+    def __init__(self, root=None):
+        import asyncio
+        
+        self.root = root
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="asyncio", daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the loop, returning its concurrent.futures.Future"""
+        import asyncio
+        
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def close(self):
+        """Stop the loop and wait for its thread"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
 
 
 class Win11CheckerGUI:
@@ -462,8 +3568,13 @@ class Win11CheckerGUI:
 
         self.configure_styles()
         
-        # Crea il checker
-        self.checker = Win11Checker()
+        # Crea il checker, its commands run as asyncio subprocesses on the loop of the bridge
+        self.bridge = TkAsyncioBridge(self.root)
+        self.checker = Win11Checker(AsyncProbeBackend(loop=self.bridge.loop))
+        
+        # Spans of the recent scans, for the timeline window
+
+        self.trace = tracer.add_sink(RingBufferSink())
         
         # Flags for the audit in progress
 
@@ -556,6 +3667,10 @@ class Win11CheckerGUI:
                         background=COLORS["bg_light"], 
                         foreground=COLORS["error"], 
                         font=("Segoe UI", 11, "bold"))
+        style.configure("Unknown.TLabel", 
+                        background=COLORS["bg_light"], 
+                        foreground=COLORS["warning"], 
+                        font=("Segoe UI", 11, "bold"))
         style.configure("Detail.TLabel", 
                         background=COLORS["bg_light"], 
                         foreground=COLORS["text"], 
@@ -658,6 +3773,13 @@ class Win11CheckerGUI:
                                            length=200,
                                            mode="indeterminate")
         
+        # Cancel button, shown while the check is running
+
+        self.cancel_button = ttk.Button(self.button_result_frame, 
+                                       text="Cancel", 
+                                       style="TButton",
+                                       command=self.cancel_check)
+        
         # End result on the right (hidden initially)
 
         self.final_result_label = ttk.Label(self.button_result_frame, 
@@ -687,6 +3809,12 @@ class Win11CheckerGUI:
                                        command=self.show_detailed_advice)
         self.details_button.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
         
+        self.timeline_button = ttk.Button(self.action_frame, 
+                                        text="Timeline", 
+                                        style="TButton",
+                                        command=self.show_timeline)
+        self.timeline_button.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        
         # Hide action buttons at the beginning
 
         self.action_frame.pack_forget()
@@ -869,36 +3997,75 @@ class Win11CheckerGUI:
         self.check_button.configure(text="Checking in progress...", state="disabled")
         self.progress_bar.pack(side=tk.LEFT, padx=10)
         self.progress_bar.start(10)
+        self.cancel_button.configure(text="Cancel", state="normal")
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
         
         # Set flags
 
         self.checking = True
         
-        # Start Thread
+        # Rows are filled in one by one as their check completes
 
-        threading.Thread(target=self.run_check, daemon=True).start()
+        for category in self.result_labels:
+            self.result_labels[category]["status"].configure(text="Checking...", style="Detail.TLabel")
+            self.result_labels[category]["details"].configure(text="")
+        
+        # Start the scan on the asyncio loop, its events are drained by poll_events in the Tk thread
 
-    def run_check(self):
-        """Runs background check"""
-        try:
-            # Run the checks
+        self.events = queue.Queue()
+        self.bridge.submit(self.run_check())
+        self.root.after(self.EVENT_POLL_MS, self.poll_events)
 
-            result = self.checker.run_all_checks()
-            
-            # Update the interface in the main thread
+    # Interval between two drains of the checker events, in milliseconds
 
-            self.root.after(0, self.update_results)
+    EVENT_POLL_MS = 50
+
+    async def run_check(self):
+        """Runs the check without blocking the window"""
+        try:
+            # Run the checks, every completed category is queued for the GUI. Restart
+            # Control only probes again the categories whose inputs changed
+
+            restart = bool(self.checker.fingerprints)
+            await self.checker.run_all_checks_async(
+                on_result=lambda category, result: self.events.put(("result", category)),
+                force_refresh=restart, incremental=restart)
+            self.events.put(("done", None))
         except Exception as e:
             # Handle Errors
 
-            self.root.after(0, lambda: self.show_error(str(e)))
+            self.events.put(("error", str(e)))
+
+    def poll_events(self):
+        """Apply the events queued by the checker thread, then poll again"""
+        while True:
+            try:
+                event, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+                
+            if event == "result":
+                self.update_result_row(value)
+            elif event == "done":
+                self.update_results()
+            elif event == "error":
+                self.show_error(value)
+                
+        if self.checking:
+            self.root.after(self.EVENT_POLL_MS, self.poll_events)
+
+    def cancel_check(self):
+        """Abort the running check, the unfinished categories are reported as unknown"""
+        self.cancel_button.configure(text="Cancelling...", state="disabled")
+        self.checker.cancel()
 
     def update_results(self):
-        """Update the interface with the results"""
+        """Update the interface once every check has completed"""
         # Stop the progress bar
 
         self.progress_bar.stop()
         self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
         
         # Ripristina il pulsante
         self.check_button.configure(text="Restart Control", state="normal")
@@ -909,59 +4076,8 @@ class Win11CheckerGUI:
         
         # Update the result labels
 
-        for category, data in self.checker.results.items():
-            if category in self.result_labels:
-                status_text = "✓ OK" if data["status"] else "✗ NO"
-                status_style = "Pass.TLabel" if data["status"] else "Fail.TLabel"
-                
-                self.result_labels[category]["status"].configure(text=status_text, style=status_style)
-                
-                # Prepare details in an extremely compact way
-
-                details_parts = []
-                
-                # Filter and format only essential details
-
-                if category == "cpu":
-                    if "name" in data["details"]:
-                        details_parts.append(f"Name: {data['details']['name']}")
-                    if "cores" in data["details"]:
-                        details_parts.append(f"Core: {data['details']['cores']}")
-                    if "frequency" in data["details"]:
-                        details_parts.append(f"Freq: {data['details']['frequency']}")
-                elif category == "ram":
-                    if "total" in data["details"]:
-                        details_parts.append(f"Total: {data['details']['total']}")
-                elif category == "storage":
-                    if "free_space" in data["details"]:
-                        details_parts.append(f"Free space: {data['details']['free_space']}")
-                elif category == "tpm":
-                    if "version" in data["details"]:
-                        details_parts.append(f"Version: {data['details']['version']}")
-                elif category == "secure_boot":
-                    if "enabled" in data["details"]:
-                        details_parts.append(f"Active: {'Sì' if data['details']['enabled'] else 'No'}")
-                elif category == "directx":
-                    if "directx_version" in data["details"]:
-                        details_parts.append(f"DX: {data['details']['directx_version']}")
-                    if "wddm_version" in data["details"]:
-                        details_parts.append(f"WDDM: {data['details']['wddm_version']}")
-                elif category == "architecture":
-                    if "is_64bit" in data["details"]:
-                        details_parts.append(f"64-bit: {'Sì' if data['details']['is_64bit'] else 'No'}")
-                
-                # Add the minimum requirement at the end
-
-                if "required" in data["details"]:
-                    details_parts.append(f"(Min: {data['details']['required']})")
-                
-                # Merge everything into one row
-
-                details_text = " | ".join(details_parts)
-                
-                # Set a narrower maximum wrapping width
-
-                self.result_labels[category]["details"].configure(text=details_text)
+        for category in self.checker.results:
+            self.update_result_row(category)
         
         # Show the final result next to the button
 
@@ -972,12 +4088,72 @@ class Win11CheckerGUI:
         self.action_frame.pack(fill=tk.X, padx=5, pady=5)
         self.check_scrollbar_needed()
         
+    def update_result_row(self, category):
+        """Show the result of a single category"""
+        data = self.checker.results[category]
+        if category in self.result_labels and data["details"].get("unknown"):
+            # Timed out or cancelled
+
+            self.result_labels[category]["status"].configure(text="? Unknown", style="Unknown.TLabel")
+            self.result_labels[category]["details"].configure(text=data["details"].get("error", ""))
+        elif category in self.result_labels:
+            status_text = "✓ OK" if data["status"] else "✗ NO"
+            status_style = "Pass.TLabel" if data["status"] else "Fail.TLabel"
+            
+            self.result_labels[category]["status"].configure(text=status_text, style=status_style)
+            
+            # Prepare details in an extremely compact way
+
+            details_parts = []
+            
+            # Filter and format only essential details
+
+            if category == "cpu":
+                if "name" in data["details"]:
+                    details_parts.append(f"Name: {data['details']['name']}")
+                if "cores" in data["details"]:
+                    details_parts.append(f"Core: {data['details']['cores']}")
+                if "frequency" in data["details"]:
+                    details_parts.append(f"Freq: {data['details']['frequency']}")
+            elif category == "ram":
+                if "total" in data["details"]:
+                    details_parts.append(f"Total: {data['details']['total']}")
+            elif category == "storage":
+                if "free_space" in data["details"]:
+                    details_parts.append(f"Free space: {data['details']['free_space']}")
+            elif category == "tpm":
+                if "version" in data["details"]:
+                    details_parts.append(f"Version: {data['details']['version']}")
+            elif category == "secure_boot":
+                if "enabled" in data["details"]:
+                    details_parts.append(f"Active: {'Sì' if data['details']['enabled'] else 'No'}")
+            elif category == "directx":
+                if "directx_version" in data["details"]:
+                    details_parts.append(f"DX: {data['details']['directx_version']}")
+                if "wddm_version" in data["details"]:
+                    details_parts.append(f"WDDM: {data['details']['wddm_version']}")
+            elif category == "architecture":
+                if "is_64bit" in data["details"]:
+                    details_parts.append(f"64-bit: {'Sì' if data['details']['is_64bit'] else 'No'}")
+            
+            # Add the minimum requirement at the end
+
+            if "required" in data["details"]:
+                details_parts.append(f"(Min: {data['details']['required']})")
+            
+            # Merge everything into one row
+
+            details_text = " | ".join(details_parts)
+            
+            # Set a narrower maximum wrapping width
+
+            self.result_labels[category]["details"].configure(text=details_text)
 
     def show_final_result(self):
         """Show the final result next to the button"""
         # Calculate the result
 
-        essential_checks = ["cpu", "ram", "storage", "tpm", "secure_boot", "architecture"]
+        essential_checks = self.checker.policy.essential
         essential_passed = all(self.checker.results[check]["status"] for check in essential_checks)
         
         total_passed = sum(1 for r in self.checker.results.values() if r["status"])
@@ -985,7 +4161,13 @@ class Win11CheckerGUI:
         
         # Set text and style
 
-        if essential_passed:
+        if not essential_passed and any(self.checker.results[check]["details"].get("unknown") for check in essential_checks):
+            self.final_result_label.configure(
+                text="? INCOMPLETE",
+                style="Unknown.TLabel",
+                font=("Segoe UI", 11, "bold")
+            )
+        elif essential_passed:
             self.final_result_label.configure(
                 text="✓ COMPATIBLE",
                 style="Pass.TLabel",
@@ -1008,6 +4190,7 @@ class Win11CheckerGUI:
 
         self.progress_bar.stop()
         self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
         
         # Ripristina il pulsante
         self.check_button.configure(text="Restart Control", state="normal")
@@ -1033,7 +4216,8 @@ class Win11CheckerGUI:
 
             filename = filedialog.asksaveasfilename(
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+                filetypes=[("JSON files", "*.json"), ("NDJSON files", "*.ndjson"), ("CSV files", "*.csv"),
+                           ("Compressed JSON", "*.json.gz"), ("All files", "*.*")],
                     title="Salva risultati"
                 )
                 
@@ -1091,26 +4275,27 @@ class Win11CheckerGUI:
         canvas.create_window((0, 0), window=advice_frame, anchor=tk.NW)
         
         # Add recommendations for each problem
-        essential_checks = ["cpu", "ram", "storage", "tpm", "secure_boot", "architecture"]
+        policy = self.checker.policy
         
         advice_text = {
             "cpu": {
                 "title": "Incompatible processor (CPU)",
                 "text": "• Check if your processor is on the official list of supported processors.\n"
                         "• Windows 11 requires 8th Gen Intel processors or newer, or AMD Ryzen 2000 or newer.\n"
-                        "• The processor must have at least 2 cores and a frequency of 1 GHz or higher.\n"
+                        f"• The processor must have at least {policy.limit('cpu', 'cpu_cores')} cores "
+                        f"and a frequency of {policy.limit('cpu', 'cpu_ghz')} GHz or higher.\n"
                         "• If your processor is not supported, the only solution is to upgrade your hardware."
             },
             "ram": {
                 "title": "Insufficient memory (RAM)",
-                "text": "• Windows 11 requires at least 4 GB of RAM.\n"
+                "text": f"• Windows 11 requires at least {policy.limit('ram', 'ram_gb')} GB of RAM.\n"
                         "• For best performance, we recommend that you have at least 8 GB of RAM.\n"
                         "• Check to see if your computer supports memory expansion.\n"
 "• Check the type of supported memory (DDR3, DDR4, etc.) before purchasing new modules."
             },
             "storage": {
                 "title": "Insufficient storage space",
-                "text": "• Windows 11 requires at least 64 GB of free space.\n"
+                "text": f"• Windows 11 requires at least {policy.limit('storage', 'free_gb')} GB of free space.\n"
                         "• You can free up space by deleting unnecessary files, unused programs, or by using Disk Cleanup.\n"
                         "• Consider adding an additional hard drive or SSD.\n"
                         "• SSDs perform better than traditional hard drives."
@@ -1133,6 +4318,19 @@ class Win11CheckerGUI:
 "• CAUTION: Changing these settings may require you to reinstall the operating system.\n"
                         "• Consult your motherboard manual or contact the manufacturer for specific instructions."
             },
+            "gpt": {
+                "title": "System disk not using GPT",
+                "text": "• UEFI boot and Secure Boot require a GPT partitioned system disk.\n"
+                        "• Windows 10 can convert the disk without data loss with 'mbr2gpt /convert'.\n"
+                        "• After converting, switch the firmware from Legacy/CSM to UEFI boot mode.\n"
+                        "• Back up your data before converting the disk."
+            },
+            "directx": {
+                "title": "Graphics card not compatible",
+                "text": "• Windows 11 requires a graphics card compatible with DirectX 12 and a WDDM 2.0 driver.\n"
+                        "• Install the latest driver from the graphics card manufacturer.\n"
+                        "• If the card does not support DirectX 12, it needs to be replaced."
+            },
             "architecture": {
                 "title": "Incompatible architecture",
                 "text": "• Windows 11 requires a 64-bit system.\n"
@@ -1142,7 +4340,10 @@ class Win11CheckerGUI:
             }
         }
         
-        for check in essential_checks:
+        for check in policy.essential:
+            if self.checker.results[check]["status"]:
+                continue
+                
             # Frame for the advice
             check_frame = ttk.Frame(advice_frame, style="Result.TFrame")
             check_frame.pack(fill=tk.X, padx=5, pady=5, ipady=5)
@@ -1241,7 +4442,1500 @@ class Win11CheckerGUI:
         
         advice_window.protocol("WM_DELETE_WINDOW", on_closing)
 
-def main():
+    # Colors of the span kinds in the timeline
+
+    TIMELINE_COLORS = {"scan": "disabled", "check": "accent", "probe": "success", "fact": "warning", "command": "text"}
+    
+    def show_timeline(self):
+        """Show the spans of the last scan as a timeline, one row per span"""
+        scans = [span for span in self.trace.spans() if span["name"] == "scan"]
+        if not scans:
+            messagebox.showinfo("Timeline", "No scan has been traced yet.")
+            return
+        spans = sorted(self.trace.spans(scans[-1]["trace"]), key=lambda span: span["start"])
+        
+        timeline_window = tk.Toplevel(self.root)
+        timeline_window.title("Scan timeline")
+        timeline_window.geometry("900x500")
+        timeline_window.configure(bg=COLORS["bg_dark"])
+        
+        try:
+            timeline_window.iconbitmap("win11_checker.ico")
+        except:
+            pass
+            
+        main_frame = ttk.Frame(timeline_window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        scan = scans[-1]
+        title_label = ttk.Label(main_frame, 
+                            text=f"Last scan: {scan['duration_ms']:.0f} ms, {len(spans)} spans", 
+                            style="Header.TLabel")
+        title_label.pack(pady=10)
+        
+        canvas = tk.Canvas(main_frame, bg=COLORS["bg_dark"], highlightthickness=0)
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=canvas.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
+        canvas.configure(yscrollcommand=scrollbar.set)
+        
+        # Rows are indented by depth; the bars share one time axis, the labels take the left part
+
+        depths = {}
+        for span in spans:
+            depths[span["span"]] = depths.get(span["parent"], -1) + 1
+        label_width, bar_width, row_height = 330, 520, 20
+        total_ms = max(scan["duration_ms"], 0.001)
+        for row, span in enumerate(spans):
+            y = row * row_height + 5
+            offset_ms = (span["start"] - scan["start"]) * 1000
+            x0 = label_width + bar_width * max(0.0, offset_ms) / total_ms
+            x1 = max(x0 + 2, label_width + bar_width * min(total_ms, offset_ms + span["duration_ms"]) / total_ms)
+            attributes = span["attributes"]
+            name = attributes.get("category") or attributes.get("probe") or attributes.get("fact") or attributes.get("command", "")
+            label = f"{'  ' * depths[span['span']]}{span['name']} {name}"[:48] + f"  {span['duration_ms']:.1f} ms"
+            
+            # Swallowed exceptions and errors are highlighted
+
+            problem = span["error"] or span["events"]
+            canvas.create_text(5, y + row_height / 2, anchor=tk.W, text=label, font=("Segoe UI", 8),
+                               fill=COLORS["error"] if problem else COLORS["text"])
+            canvas.create_rectangle(x0, y + 3, x1, y + row_height - 3, width=0,
+                                    fill=COLORS[self.TIMELINE_COLORS.get(span["name"], "accent")])
+            if problem:
+                details = span["error"] or "; ".join(f"{event.get('type')}: {event.get('message')}" for event in span["events"])
+                canvas.create_text(x1 + 4, y + row_height / 2, anchor=tk.W, text=details[:80], font=("Segoe UI", 8),
+                                   fill=COLORS["error"])
+                                   
+        canvas.config(scrollregion=(0, 0, label_width + bar_width + 400, len(spans) * row_height + 10))
+
+
+def load_gui_modules():
+    """Import tkinter and PIL, which the headless mode never needs"""
+    global tk, ttk, messagebox, filedialog, Image, ImageTk
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+    
+    # Without PIL the header falls back to a text logo
+
+    try:
+        from PIL import Image, ImageTk
+    except ImportError:
+        Image = ImageTk = None
+
+
+# Exit codes of the headless mode
+
+EXIT_COMPATIBLE = 0
+EXIT_NOT_COMPATIBLE = 1
+EXIT_ERROR = 3
+EXIT_INCOMPLETE = 4
+
+
+def run_headless(output_format="json", use_cache=True, force_refresh=False, max_workers=4, stream=None,
+                 backend=None, probe_timeout=None, run_timeout=None, policy=None, use_async=False,
+                 export=None, append=False):
+    """Run the checks without a GUI and print the results to stdout.
+
+    With use_async the commands run concurrently as asyncio subprocesses.
+    With export the results are also written to that file, see export_results().
+    An export target that cannot be written that way fails before the scan;
+    when the export itself fails, the results are still printed, with the
+    error under "export_error", and the exit code is EXIT_ERROR.
+    """
+    stream = stream or sys.stdout
+    export_error = None
+    try:
+        if export:
+            check_export_target(export, append=append)
+        if use_async:
+            backend = AsyncProbeBackend(backend)
+        checker = Win11Checker(backend, max_workers=max_workers, cache=use_cache, policy=policy)
+        if probe_timeout is not None:
+            checker.probe_timeout = probe_timeout
+        if run_timeout is not None:
+            checker.run_timeout = run_timeout
+        if use_async:
+            import asyncio
+            result = asyncio.run(checker.run_all_checks_async(force_refresh=force_refresh))
+        else:
+            result = checker.run_all_checks(force_refresh=force_refresh)
+        if isinstance(backend, RecordingProbeBackend):
+            backend.save()
+    except Exception as e:
+        stream.write(json.dumps({"host": platform.node(), "error": str(e)}) + "\n")
+        return EXIT_ERROR
+        
+    if export:
+        try:
+            checker.export_results(export, append=append)
+        except Exception as e:
+            export_error = f"Export to {export} failed: {e}"
+            
+    host = platform.node()
+    extra = {"export_error": export_error} if export_error else {}
+    if output_format == "ndjson":
+        # One line per category, then the summary
+
+        for category, data in result["details"].items():
+            stream.write(json.dumps({"host": host, "category": category, **data}, default=str) + "\n")
+        stream.write(json.dumps({"host": host, "compatible": result["compatible"], "summary": result["summary"],
+                                 **extra}) + "\n")
+    else:
+        stream.write(json.dumps({"host": host, **result, **extra}, indent=2, default=str) + "\n")
+        
+    if export_error:
+        return EXIT_ERROR
+    if result["compatible"]:
+        return EXIT_COMPATIBLE
+        
+    # Incomplete only when nothing failed outright, as in the batch and fleet reports
+
+    failed = [c for c in Win11Checker.CHECKS
+              if not result["details"][c]["status"] and not result["details"][c]["details"].get("unknown")]
+    return EXIT_INCOMPLETE if result["summary"]["unknown_checks"] and not failed else EXIT_NOT_COMPATIBLE
+
+
+def default_daemon_address():
+    """Named pipe on Windows, a Unix socket of this user elsewhere"""
+    if os.name == "nt":
+        return r"\\.\pipe\CompCheckWin11"
+    import tempfile
+    
+    folder = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(folder, f"compcheckwin11-{os.getuid()}.sock")
+
+
+def default_daemon_authkey():
+    """Secret the daemon and the clients of this user share, created on first use next to the probe cache"""
+    path = os.path.join(os.path.dirname(default_cache_path()), "daemon.key")
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "rb") as f:
+            return f.read()
+    key = os.urandom(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class CheckerDaemon:
+    """Keeps a Win11Checker warm and answers queries about its last results over local IPC.
+
+    Results are refreshed on a schedule, when the change signals of a probed
+    category move (polled every watch_interval seconds) and on request.
+    Refreshes are incremental and single-flight: concurrent requests share
+    the run in progress. Queries are answered from the last snapshot.
+
+    Clients must know authkey, by default the key of default_daemon_authkey().
+    Every message is JSON; an array of requests is a batch answered by an
+    array of responses. Requests: {"op": "status" | "result" | "category" |
+    "refresh" | "ping", "policy": name, "name": category, "full": bool}.
+    """
+
+    def __init__(self, checker=None, address=None, refresh_interval=3600.0, watch_interval=30.0, authkey=None):
+        self.checker = checker or Win11Checker()
+        self.address = address or default_daemon_address()
+        self.refresh_interval = refresh_interval
+        self.watch_interval = watch_interval
+        self.authkey = authkey or default_daemon_authkey()
+        self.lock = threading.Lock()
+        self.flight = None
+        self.snapshot = None
+        self.evaluations = {}
+        self.stop_event = threading.Event()
+        self.listener = None
+
+    def refresh(self, full=False):
+        """Probe again, only the changed categories unless full; return the new snapshot"""
+        with self.lock:
+            flight = self.flight
+            owner = flight is None
+            if owner:
+                flight = self.flight = threading.Event()
+        if not owner:
+            flight.wait()
+            return self.snapshot
+            
+        start = time.perf_counter()
+        try:
+            result = self.checker.run_all_checks(force_refresh=True, incremental=not full)
+            
+            # The checker reuses its dicts on the next run, the snapshot must not change under the readers
+
+            snapshot = {"result": json.loads(json.dumps(result, default=str)),
+                        "raw": json.loads(json.dumps(self.checker.raw_results, default=str)), "error": None}
+        except Exception as e:
+            snapshot = {"result": None, "raw": None, "error": str(e)}
+        snapshot.update(
+            version=(self.snapshot["version"] + 1) if self.snapshot else 1,
+            refreshed_at=time.time(),
+            duration_ms=round((time.perf_counter() - start) * 1000, 3)
+        )
+        try:
+            with self.lock:
+                self.snapshot = snapshot
+                self.evaluations = {}
+                self.flight = None
+        finally:
+            flight.set()
+        return snapshot
+
+    def evaluate(self, snapshot, policy):
+        """Result of the snapshot under another policy, computed once per snapshot"""
+        if policy is None or policy == snapshot["result"]["summary"]["policy"]:
+            return snapshot["result"]
+        key = (snapshot["version"], policy)
+        result = self.evaluations.get(key)
+        if result is None:
+            result = Win11Checker.from_raw(snapshot["raw"], policy).run_all_checks()
+            self.evaluations[key] = result = json.loads(json.dumps(result, default=str))
+        return result
+
+    def handle(self, request):
+        """Answer one request"""
+        try:
+            op = request.get("op", "status")
+            if op == "ping":
+                return {"ok": True, "op": "ping"}
+            snapshot = self.refresh(request.get("full", False)) if op == "refresh" else self.snapshot
+            if snapshot is None:
+                snapshot = self.refresh()
+            response = {
+                "ok": snapshot["error"] is None,
+                "op": op,
+                "version": snapshot["version"],
+                "refreshed_at": snapshot["refreshed_at"],
+                "age_s": round(time.time() - snapshot["refreshed_at"], 3)
+            }
+            if snapshot["error"] is not None:
+                response["error"] = snapshot["error"]
+                return response
+                
+            result = self.evaluate(snapshot, request.get("policy"))
+            details = result["details"]
+            if op in ("status", "refresh"):
+                response.update(
+                    compatible=result["compatible"],
+                    policy=result["summary"]["policy"],
+                    failed=[c for c in Win11Checker.CHECKS if not details[c]["status"] and not details[c]["details"].get("unknown")],
+                    unknown=result["summary"]["unknown_checks"],
+                    duration_ms=snapshot["duration_ms"]
+                )
+            elif op == "result":
+                response.update(result)
+            elif op == "category":
+                name = request.get("name")
+                if name not in Win11Checker.CHECKS:
+                    return {"ok": False, "op": op, "error": f"unknown category: {name}"}
+                response.update(name=name, **details[name])
+            else:
+                return {"ok": False, "op": op, "error": f"unknown op: {op}"}
+            return response
+        except (ValueError, KeyError, AttributeError) as e:
+            return {"ok": False, "error": str(e)}
+
+    def handle_message(self, message):
+        """Answer a request or a batch of requests, both JSON encoded"""
+        try:
+            request = json.loads(message)
+        except ValueError as e:
+            return json.dumps({"ok": False, "error": f"invalid JSON: {e}"}).encode()
+        if isinstance(request, list):
+            return json.dumps([self.handle(item) if isinstance(item, dict) else {"ok": False, "error": "not an object"}
+                               for item in request]).encode()
+        if not isinstance(request, dict):
+            return json.dumps({"ok": False, "error": "not an object"}).encode()
+        return json.dumps(self.handle(request)).encode()
+
+    def serve_connection(self, connection):
+        with connection:
+            while not self.stop_event.is_set():
+                try:
+                    message = connection.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                connection.send_bytes(self.handle_message(message))
+
+    def schedule(self):
+        """Refresh every refresh_interval, or sooner once a probed category's inputs changed"""
+        last_refresh = time.monotonic()
+        while not self.stop_event.wait(min(self.watch_interval, self.refresh_interval)):
+            if time.monotonic() - last_refresh >= self.refresh_interval or self.checker.changed_categories():
+                self.refresh()
+                last_refresh = time.monotonic()
+
+    def start(self):
+        """Take the first snapshot and listen; serve_forever() then accepts the clients"""
+        from multiprocessing.connection import Listener
+        
+        self.refresh(full=True)
+        if os.name != "nt" and os.path.exists(self.address):
+            os.remove(self.address)
+            
+        # The socket must be private from the moment it is bound, not after a chmod
+
+        umask = os.umask(0o077) if os.name != "nt" else None
+        try:
+            self.listener = Listener(self.address, authkey=self.authkey)
+        finally:
+            if umask is not None:
+                os.umask(umask)
+        threading.Thread(target=self.schedule, daemon=True).start()
+
+    def serve_forever(self):
+        from multiprocessing import AuthenticationError
+        
+        if self.listener is None:
+            self.start()
+        while not self.stop_event.is_set():
+            try:
+                connection = self.listener.accept()
+            except (AuthenticationError, EOFError):
+                # A client without the key, or gone during the handshake
+
+                continue
+            except OSError:
+                if self.stop_event.is_set():
+                    break
+                continue
+            threading.Thread(target=self.serve_connection, args=(connection,), daemon=True).start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.listener is not None:
+            self.listener.close()
+            if os.name != "nt" and os.path.exists(self.address):
+                os.remove(self.address)
+
+
+class DaemonClient:
+    """Connection to a CheckerDaemon, kept open across requests"""
+
+    def __init__(self, address=None, authkey=None):
+        from multiprocessing.connection import Client
+        
+        self.connection = Client(address or default_daemon_address(), authkey=authkey or default_daemon_authkey())
+
+    def request(self, op="status", **params):
+        self.connection.send_bytes(json.dumps({"op": op, **params}).encode())
+        return json.loads(self.connection.recv_bytes())
+
+    def batch(self, requests):
+        """Send several requests in one message, answered in order"""
+        self.connection.send_bytes(json.dumps(requests).encode())
+        return json.loads(self.connection.recv_bytes())
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def benchmark_daemon(requests=2000, clients=4, latency=0.0):
+    """Serve the sample machine from a daemon on a private address and time the queries.
+
+    Each client sends requests status queries on its own connection, in
+    parallel; the round trips are reported in microseconds, then one batch.
+    """
+    import tempfile
+    
+    if os.name == "nt":
+        address = rf"\\.\pipe\CompCheckWin11-bench-{os.getpid()}"
+    else:
+        address = os.path.join(tempfile.mkdtemp(prefix="compcheckwin11_"), "daemon.sock")
+    authkey = os.urandom(32)
+    daemon = CheckerDaemon(Win11Checker(FakeProbeBackend(latency=latency), cache=False), address, authkey=authkey)
+    daemon.start()
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    
+    samples = []
+    samples_lock = threading.Lock()
+    
+    def client():
+        with DaemonClient(address, authkey) as connection:
+            times = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                connection.request("status")
+                times.append((time.perf_counter() - start) * 1e6)
+        with samples_lock:
+            samples.extend(times)
+            
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    with DaemonClient(address, authkey) as connection:
+        batch_start = time.perf_counter()
+        answers = connection.batch([{"op": "status"}, {"op": "category", "name": "tpm"}, {"op": "status", "policy": "corporate"}])
+        batch_us = (time.perf_counter() - batch_start) * 1e6
+    daemon.close()
+    return {
+        "clients": clients,
+        "requests": requests * clients,
+        "requests_per_second": round(requests * clients / elapsed),
+        "round_trip_us": summarise_samples(samples),
+        "batch": {"requests": len(answers), "us": round(batch_us, 1), "ok": all(answer["ok"] for answer in answers)}
+    }
+
+
+def evaluate_host(record, policy=None):
+    """Evaluate the raw probe results of one host of a batch inventory"""
+    checker = Win11Checker.from_raw(record.get("raw", {}), policy)
+    result = checker.run_all_checks()
+    details = result["details"]
+    return {
+        "host": record.get("host"),
+        "compatible": result["compatible"],
+        "failed": [c for c in Win11Checker.CHECKS if not details[c]["status"] and not details[c]["details"].get("unknown")],
+        "unknown": result["summary"]["unknown_checks"],
+        "cpu_generation": details["cpu"]["details"].get("generation"),
+        "cpu_family": details["cpu"]["details"].get("family"),
+        **policy_facts(checker.raw_results)
+    }
+
+
+def evaluate_inventory_lines(lines, policy=None):
+    """Evaluate a chunk of NDJSON inventory lines, in a batch worker process"""
+    summaries = []
+    for line in lines:
+        try:
+            summaries.append(evaluate_host(json.loads(line), policy))
+        except Exception as e:
+            summaries.append({"host": None, "error": f"Invalid inventory record: {e}"})
+    return summaries
+
+
+def iter_chunks(lines, chunk_size):
+    """Group the non-empty lines into lists of chunk_size lines"""
+    chunk = []
+    for line in lines:
+        if line.strip():
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchReport:
+    """Aggregated results of a batch, made of counters only whatever the number of hosts"""
+
+    def __init__(self):
+        self.hosts = 0
+        self.compatible = 0
+        self.incomplete = 0
+        self.errors = 0
+        self.failures = {}
+        self.unknown = {}
+        self.cpu_generations = {}
+        self.seconds = 0.0
+
+    def add(self, summary):
+        self.hosts += 1
+        if "error" in summary:
+            self.errors += 1
+            return
+            
+        # Incomplete: nothing failed, but some requirements could not be determined
+
+        if summary["compatible"]:
+            self.compatible += 1
+        elif summary["unknown"] and not summary["failed"]:
+            self.incomplete += 1
+        for category in summary["failed"]:
+            self.failures[category] = self.failures.get(category, 0) + 1
+        for category in summary["unknown"]:
+            self.unknown[category] = self.unknown.get(category, 0) + 1
+        generation = f"{summary['cpu_family']} {summary['cpu_generation']}" if summary["cpu_family"] else "not collected"
+        self.cpu_generations[generation] = self.cpu_generations.get(generation, 0) + 1
+
+    def as_dict(self):
+        return {
+            "hosts": self.hosts,
+            "compatible": self.compatible,
+            "not_compatible": self.hosts - self.compatible - self.incomplete - self.errors,
+            "incomplete": self.incomplete,
+            "errors": self.errors,
+            "failures": dict(sorted(self.failures.items(), key=lambda item: -item[1])),
+            "unknown": dict(sorted(self.unknown.items(), key=lambda item: -item[1])),
+            "cpu_generations": dict(sorted(self.cpu_generations.items())),
+            "seconds": round(self.seconds, 3)
+        }
+
+
+def run_batch(lines, workers=None, chunk_size=500, on_host=None, policy=None):
+    """Evaluate an inventory of hosts in parallel on a process pool.
+
+    lines are NDJSON records {"host": name, "raw": raw probe results}, read
+    lazily: at most two chunks per worker are in flight, so memory stays
+    bounded whatever the size of the inventory. on_host(summary) is called
+    for every host, in inventory order. policy is the name or file of the
+    policy the hosts are evaluated against.
+    """
+    from collections import deque
+    
+    start = time.perf_counter()
+    report = BatchReport()
+    
+    def collect(summaries):
+        for summary in summaries:
+            report.add(summary)
+            if on_host is not None:
+                on_host(summary)
+                
+    chunks = iter_chunks(lines, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in chunks:
+            collect(evaluate_inventory_lines(chunk, policy))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(evaluate_inventory_lines, chunk, policy))
+                if len(pending) >= workers * 2:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+                
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def generate_inventory(stream, hosts, seed=0):
+    """Write a random batch inventory of hosts, to try the batch mode anywhere"""
+    import random
+    
+    rng = random.Random(seed)
+    cpus = [
+        "Intel(R) Core(TM) i7-8700 CPU @ 3.20GHz", "Intel(R) Core(TM) i5-7500 CPU @ 3.40GHz",
+        "Intel(R) Core(TM) i5-1135G7 @ 2.40GHz", "Intel(R) Core(TM) i3-4130 CPU @ 3.40GHz",
+        "AMD Ryzen 5 3600 6-Core Processor", "AMD Ryzen 7 1700 Eight-Core Processor",
+        "AMD FX(tm)-8350 Eight-Core Processor"
+    ]
+    for index in range(hosts):
+        raw = {
+            "cpu": {"name": rng.choice(cpus), "architecture": "AMD64", "cores": rng.choice([2, 4, 6, 8]),
+                    "frequency": rng.choice([2.4, 3.2, 3.6])},
+            "ram": rng.choice([2, 4, 8, 16, 32]),
+            "storage": {"largest_free_gb": 0, "system_drive": "C:", "all_drives": [], "system_drive_free_gb": 0},
+            "tpm": rng.choice([0, 1.2, 2.0, 2.0, 2.0]),
+            "secure_boot": rng.random() < 0.8,
+            "gpt": rng.random() < 0.85,
+            "directx": {"directx_version": 12, "wddm_version": rng.choice([1.3, 2.0, 2.7]), "source": "registry"},
+            "architecture": {"architecture": "AMD64", "is_64bit": rng.random() < 0.97}
+        }
+        free_gb = rng.choice([20, 60, 120, 400])
+        raw["storage"].update(largest_free_gb=free_gb, system_drive_free_gb=free_gb,
+                              all_drives=[{"drive": "C:", "free_gb": free_gb, "total_gb": free_gb * 2}])
+        
+        # Some agents fail to report a category
+
+        if rng.random() < 0.02:
+            del raw[rng.choice(list(raw))]
+        stream.write(json.dumps({"host": f"host{index:06d}", "raw": raw}) + "\n")
+
+
+# Fields of a HostRecord: name, struct format, numpy dtype. Records are packed
+# without padding, little-endian, so a record file maps to a numpy structured array
+
+HOST_RECORD_FIELDS = [
+    ("host", "64s", "S64"),
+    ("scanned_at", "d", "<f8"),
+    ("compatible", "B", "u1"),
+    ("failed", "H", "<u2"),
+    ("unknown", "H", "<u2"),
+    ("cpu_generation", "h", "<i2"),
+    ("cpu_cores", "H", "<u2"),
+    ("cpu_ghz", "f", "<f4"),
+    ("ram_gb", "f", "<f4"),
+    ("free_gb", "f", "<f4"),
+    ("tpm_version", "f", "<f4"),
+    ("directx_version", "B", "u1"),
+    ("wddm_version", "f", "<f4"),
+    ("is_64bit", "B", "u1"),
+    ("cpu_supported", "B", "u1"),
+    ("secure_boot", "B", "u1"),
+    ("gpt", "B", "u1")
+]
+HOST_RECORD_FORMAT = "<" + "".join(code for _, code, _ in HOST_RECORD_FIELDS)
+HOST_RECORD_SIZE = struct.calcsize(HOST_RECORD_FORMAT)
+
+# failed and unknown are bitmasks of the check categories
+
+CATEGORY_BITS = {category: 1 << index for index, category in enumerate(Win11Checker.CHECKS)}
+
+
+def category_mask(categories):
+    return sum(CATEGORY_BITS[category] for category in categories)
+
+
+def mask_categories(mask):
+    return [category for category, bit in CATEGORY_BITS.items() if mask & bit]
+
+
+class HostRecord:
+    """Fixed-schema, numeric result of one host, as stored in a HostRecordFile"""
+
+    __slots__ = tuple(name for name, _, _ in HOST_RECORD_FIELDS)
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_summary(cls, summary, scanned_at=None):
+        """Record of a host summary returned by evaluate_host()"""
+        def clamp(value, low, high):
+            return min(max(int(value), low), high)
+            
+        generation = summary["cpu_generation"]
+        return cls(
+            (summary["host"] or "").encode("utf-8")[:64],
+            time.time() if scanned_at is None else scanned_at,
+            int(summary["compatible"]),
+            category_mask(summary["failed"]),
+            category_mask(summary["unknown"]),
+            -1 if generation is None else clamp(generation, -1, 32767),
+            clamp(summary["cpu_cores"], 0, 65535),
+            summary["cpu_ghz"],
+            summary["ram_gb"],
+            summary["free_gb"],
+            summary["tpm_version"],
+            clamp(summary["directx_version"], 0, 255),
+            summary["wddm_version"],
+            int(summary["is_64bit"]),
+            int(summary["cpu_supported"]),
+            int(summary["secure_boot"]),
+            int(summary["gpt"])
+        )
+
+    def pack(self):
+        return struct.pack(HOST_RECORD_FORMAT, *(getattr(self, name) for name in self.__slots__))
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["host"] = self.host.rstrip(b"\0").decode("utf-8", "replace")
+        data["failed"] = mask_categories(self.failed)
+        data["unknown"] = mask_categories(self.unknown)
+        return data
+
+
+def load_numpy():
+    """numpy if installed, None otherwise: the record queries then fall back to struct"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class HostRecordFile:
+    """Append-only file of HostRecords, which memory-maps to a numpy structured array.
+
+    A HEADER_SIZE bytes header holds the magic and, as JSON, the numpy dtype of
+    the records, which follow back to back:
+    numpy.memmap(path, dtype=numpy.dtype(header["dtype"]), mode="r", offset=HEADER_SIZE)
+    """
+
+    MAGIC = b"CCW11REC"
+    HEADER_SIZE = 512
+
+    def __init__(self, path):
+        self.path = path
+
+    def header(self):
+        return {
+            "version": 2,
+            "dtype": [[name, dtype] for name, _, dtype in HOST_RECORD_FIELDS],
+            "record_size": HOST_RECORD_SIZE
+        }
+
+    def read_header(self, f):
+        data = f.read(self.HEADER_SIZE)
+        if len(data) < self.HEADER_SIZE or not data.startswith(self.MAGIC):
+            raise ValueError(f"{self.path} is not a host record file")
+        header = json.loads(data[len(self.MAGIC):].rstrip(b" \n\0"))
+        if header != self.header():
+            raise ValueError(f"{self.path} holds records of another schema")
+        return header
+
+    def append(self, records):
+        """Append HostRecords, creating the file with its header if needed"""
+        with open(self.path, "ab+") as f:
+            f.seek(0)
+            if f.read(1):
+                f.seek(0)
+                self.read_header(f)
+            else:
+                header = self.MAGIC + json.dumps(self.header()).encode("ascii")
+                f.write(header.ljust(self.HEADER_SIZE - 1) + b"\n")
+            f.seek(0, os.SEEK_END)
+            f.write(b"".join(record.pack() for record in records))
+
+    def __len__(self):
+        return max(0, os.path.getsize(self.path) - self.HEADER_SIZE) // HOST_RECORD_SIZE
+
+    def __iter__(self):
+        import mmap
+        
+        with open(self.path, "rb") as f:
+            self.read_header(f)
+            if not len(self):
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = self.HEADER_SIZE + len(self) * HOST_RECORD_SIZE
+                for values in struct.iter_unpack(HOST_RECORD_FORMAT, data[self.HEADER_SIZE:end]):
+                    yield HostRecord(*values)
+
+    def array(self):
+        """The records as a read-only numpy memmap, None without numpy"""
+        numpy = load_numpy()
+        if numpy is None:
+            return None
+        with open(self.path, "rb") as f:
+            header = self.read_header(f)
+        dtype = numpy.dtype([tuple(field) for field in header["dtype"]])
+        return numpy.memmap(self.path, dtype=dtype, mode="r", offset=self.HEADER_SIZE, shape=(len(self),))
+
+    def column(self, name):
+        """Values of one field of every record: a numpy array, or a list without numpy"""
+        array = self.array()
+        if array is not None:
+            return array[name]
+            
+        # Only the requested field is decoded, the rest of each record is skipped as padding
+
+        import mmap
+        
+        offset = struct.calcsize("<" + "".join(code for field, code, _ in HOST_RECORD_FIELDS[:self.field_index(name)]))
+        code = HOST_RECORD_FIELDS[self.field_index(name)][1]
+        field_format = f"<{offset}x{code}{HOST_RECORD_SIZE - offset - struct.calcsize('<' + code)}x"
+        with open(self.path, "rb") as f:
+            self.read_header(f)
+            if not len(self):
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = self.HEADER_SIZE + len(self) * HOST_RECORD_SIZE
+                values = [values[0] for values in struct.iter_unpack(field_format, data[self.HEADER_SIZE:end])]
+                
+        # Like numpy, strip the padding of byte strings
+
+        if code.endswith("s"):
+            values = [value.rstrip(b"\0") for value in values]
+        return values
+
+    def field_index(self, name):
+        for index, (field, _, _) in enumerate(HOST_RECORD_FIELDS):
+            if field == name:
+                return index
+        raise KeyError(name)
+
+    def count_failing_only(self, *categories):
+        """Number of hosts failing exactly these categories, e.g. count_failing_only("tpm")"""
+        mask = category_mask(categories)
+        failed = self.column("failed")
+        if isinstance(failed, list):
+            return failed.count(mask)
+        return int((failed == mask).sum())
+
+    def columns(self, names=None):
+        """Several columns at once, by default the raw facts read by evaluate_columns()"""
+        return {name: self.column(name) for name in names or POLICY_FACTS}
+
+    def evaluate(self, policy=None):
+        """Re-evaluate the stored facts against a policy, see evaluate_columns()"""
+        return evaluate_columns(self.columns(), unknown=self.column("unknown"), policy=policy)
+
+    def failure_counts(self):
+        """Number of hosts failing each category"""
+        failed = self.column("failed")
+        if isinstance(failed, list):
+            return {category: sum(1 for mask in failed if mask & bit) for category, bit in CATEGORY_BITS.items()}
+        return {category: int(((failed & bit) != 0).sum()) for category, bit in CATEGORY_BITS.items()}
+
+
+def evaluate_columns(columns, unknown=None, policy=None):
+    """Evaluate many hosts at once from columns of raw facts against a policy.
+
+    columns maps the POLICY_FACTS to numpy arrays, or to sequences when numpy
+    is missing, in which case the hosts are evaluated one by one. unknown is
+    an optional column of bitmasks of the undetermined categories, which
+    count as failed. Returns (compatible, reasons): whether each host is
+    compatible, and the bitmask (CATEGORY_BITS) of the categories it fails.
+    """
+    policy = policy if isinstance(policy, Policy) else load_policy(policy)
+    essential = category_mask(policy.essential)
+    numpy = load_numpy()
+    if numpy is None:
+        hosts = len(columns[POLICY_FACTS[0]])
+        reasons = [0] * hosts if unknown is None else list(unknown)
+        for index in range(hosts):
+            host = {name: values[index] for name, values in columns.items()}
+            for category, rule in policy.predicates.items():
+                if not rule(host):
+                    reasons[index] |= CATEGORY_BITS[category]
+        return [not reason & essential for reason in reasons], reasons
+        
+    columns = {name: numpy.asarray(values) for name, values in columns.items()}
+    hosts = len(columns[POLICY_FACTS[0]])
+    reasons = numpy.zeros(hosts, dtype=numpy.uint16) if unknown is None else numpy.array(unknown, dtype=numpy.uint16)
+    for category, rule in policy.predicates.items():
+        reasons |= numpy.where(rule(columns), 0, CATEGORY_BITS[category]).astype(numpy.uint16)
+    return (reasons & essential) == 0, reasons
+
+
+def check_evaluator_parity(hosts=1000, seed=0, policy=None):
+    """Compare evaluate_columns() with the scalar Win11Checker path on a random inventory.
+
+    Every host is evaluated by evaluate_host(), stored as a HostRecord, then
+    re-evaluated from the record columns; both must agree on compatibility
+    and on the failed (or unknown) categories.
+    """
+    import io
+    
+    inventory = io.StringIO()
+    generate_inventory(inventory, hosts, seed)
+    summaries = evaluate_inventory_lines(inventory.getvalue().splitlines(), policy)
+    records = [HostRecord.from_summary(summary, scanned_at=0.0) for summary in summaries]
+    columns = {name: [getattr(record, name) for record in records] for name in POLICY_FACTS}
+    compatible, reasons = evaluate_columns(columns, unknown=[record.unknown for record in records], policy=policy)
+    
+    mismatches = []
+    for index, summary in enumerate(summaries):
+        expected = category_mask(summary["failed"]) | category_mask(summary["unknown"])
+        if bool(compatible[index]) != summary["compatible"] or int(reasons[index]) != expected:
+            mismatches.append({
+                "host": summary["host"],
+                "scalar": {"compatible": summary["compatible"], "failed": mask_categories(expected)},
+                "columns": {"compatible": bool(compatible[index]), "failed": mask_categories(int(reasons[index]))}
+            })
+    return {
+        "hosts": hosts,
+        "numpy": load_numpy() is not None,
+        "mismatches": len(mismatches),
+        "examples": mismatches[:10],
+        "passed": not mismatches
+    }
+
+
+def iter_export_records(path):
+    """Stream the host records of an export file: a JSON document or list, NDJSON lines or CSV rows"""
+    format, _ = export_format(path)
+    with open_export(path) as f:
+        if format == "csv":
+            import csv
+            for row in csv.DictReader(f):
+                yield {"host": row["host"], "exported_at": row["exported_at"], "raw": json.loads(row["raw"])}
+        elif format == "ndjson":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            document = json.load(f)
+            yield from (document if isinstance(document, list) else [document])
+
+
+def summarise_export_files(files, policy=None):
+    """Evaluate the host records of export files, in a fleet worker process.
+
+    files are (path, mtime_ns, size) tuples; for each one the result holds
+    them back with one row per record (see FLEET_SCHEMA) and the error that
+    stopped the file from being read, if any.
+    """
+    results = []
+    for path, mtime_ns, size in files:
+        rows = []
+        error = None
+        try:
+            for record in iter_export_records(path):
+                summary = evaluate_host(record, policy)
+                incomplete = not summary["compatible"] and bool(summary["unknown"]) and not summary["failed"]
+                cpu = f"{summary['cpu_family']} {summary['cpu_generation']}" if summary["cpu_family"] else "not collected"
+                rows.append((summary["host"], record.get("exported_at"), int(summary["compatible"]), int(incomplete), 0,
+                             category_mask(summary["failed"]), category_mask(summary["unknown"]), cpu,
+                             summary["ram_gb"], summary["free_gb"]))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            rows.append((None, None, 0, 0, 1, 0, 0, None, None, None))
+        results.append((path, mtime_ns, size, rows, error))
+    return results
+
+
+def scan_export_files(directory):
+    """Yield (path relative to directory, mtime_ns, size) of the export files below directory.
+
+    Hidden files, e.g. exports still being written and the fleet index, are skipped.
+    """
+    folders = [(directory, "")]
+    while folders:
+        folder, prefix = folders.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                folders.append((entry.path, prefix + entry.name + os.sep))
+                continue
+            base, extension = os.path.splitext(entry.name.lower())
+            if extension in EXPORT_COMPRESSIONS:
+                extension = os.path.splitext(base)[1]
+            if extension not in EXPORT_FORMATS:
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            yield prefix + entry.name, stat.st_mtime_ns, stat.st_size
+
+
+# Tables of the fleet index: the files read so far, and one row per host record
+# they hold, with its failed and unknown categories as CATEGORY_BITS masks
+
+FLEET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime_ns INTEGER, size INTEGER,
+                                  records INTEGER, error TEXT);
+CREATE TABLE IF NOT EXISTS hosts (id INTEGER PRIMARY KEY, file_id INTEGER, host TEXT, exported_at TEXT,
+                                  compatible INTEGER, incomplete INTEGER, error INTEGER, failed INTEGER,
+                                  unknown INTEGER, cpu TEXT, ram_gb REAL, free_gb REAL);
+CREATE INDEX IF NOT EXISTS hosts_file ON hosts (file_id);
+"""
+
+# Upper bounds of the free space buckets of the fleet report, in GB
+
+FREE_SPACE_BUCKETS = (64, 128, 256, 512, 1024)
+
+
+class FleetIndex:
+    """sqlite index of the export files of a directory and of the hosts they hold.
+
+    A file is read again only when its modification time or size changed, so
+    re-running over a share only reads the new exports. The index is rebuilt
+    when the policy or the CPU database changes.
+    """
+
+    def __init__(self, path, policy=None):
+        import sqlite3
+        
+        self.db = sqlite3.connect(path)
+        self.db.executescript(FLEET_SCHEMA)
+        policy = load_policy(policy)
+        signature = json.dumps({"essential": policy.essential, "rules": policy.rules,
+                                "cpu_database": cpu_database().version}, sort_keys=True)
+        stored = self.db.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        if stored is None or stored[0] != signature:
+            with self.db:
+                self.db.execute("DELETE FROM hosts")
+                self.db.execute("DELETE FROM files")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature,))
+
+    def plan(self, entries):
+        """Compare the scanned files with the index: drop the removed ones, return the count
+        of unchanged files and a cursor over the new or modified ones"""
+        db = self.db
+        db.execute("DROP TABLE IF EXISTS temp.seen")
+        db.execute("DROP TABLE IF EXISTS temp.todo")
+        db.execute("CREATE TEMP TABLE seen (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER)")
+        db.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?)", entries)
+        db.execute("""CREATE TEMP TABLE todo AS SELECT s.path, s.mtime_ns, s.size FROM seen s
+                      LEFT JOIN files f ON f.path = s.path
+                      WHERE f.path IS NULL OR f.mtime_ns != s.mtime_ns OR f.size != s.size""")
+        with db:
+            removed = db.execute("DELETE FROM hosts WHERE file_id IN "
+                                 "(SELECT id FROM files WHERE path NOT IN (SELECT path FROM seen))").rowcount
+            removed_files = db.execute("DELETE FROM files WHERE path NOT IN (SELECT path FROM seen)").rowcount
+        total = db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        changed = db.execute("SELECT COUNT(*) FROM todo").fetchone()[0]
+        return {"files": total, "unchanged": total - changed, "removed": removed_files, "removed_hosts": removed}, \
+            db.execute("SELECT path, mtime_ns, size FROM todo")
+
+    def store(self, results):
+        """Replace the rows of the files just read"""
+        with self.db:
+            for path, mtime_ns, size, rows, error in results:
+                found = self.db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+                if found:
+                    file_id = found[0]
+                    self.db.execute("DELETE FROM hosts WHERE file_id = ?", (file_id,))
+                    self.db.execute("UPDATE files SET mtime_ns = ?, size = ?, records = ?, error = ? WHERE id = ?",
+                                    (mtime_ns, size, len(rows), error, file_id))
+                else:
+                    file_id = self.db.execute("INSERT INTO files (path, mtime_ns, size, records, error) VALUES (?, ?, ?, ?, ?)",
+                                              (path, mtime_ns, size, len(rows), error)).lastrowid
+                self.db.executemany("INSERT INTO hosts (file_id, host, exported_at, compatible, incomplete, error, failed, "
+                                    "unknown, cpu, ram_gb, free_gb) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    [(file_id, *row) for row in rows])
+
+    def report(self):
+        """Statistics over the latest record of every host"""
+        self.db.execute("DROP TABLE IF EXISTS temp.latest")
+        self.db.execute("CREATE TEMP TABLE latest AS SELECT * FROM (SELECT *, ROW_NUMBER() OVER "
+                        "(PARTITION BY COALESCE(host, 'record ' || id) ORDER BY exported_at DESC) AS n FROM hosts) WHERE n = 1")
+        categories = list(CATEGORY_BITS)
+        sums = ", ".join(f"SUM(failed & {CATEGORY_BITS[c]} != 0), SUM(unknown & {CATEGORY_BITS[c]} != 0)" for c in categories)
+        row = self.db.execute(f"SELECT COUNT(*), COALESCE(SUM(compatible), 0), COALESCE(SUM(incomplete), 0), "
+                              f"COALESCE(SUM(error), 0), {sums} FROM latest").fetchone()
+        hosts, compatible, incomplete, errors = row[:4]
+        failures = {c: row[4 + 2 * i] or 0 for i, c in enumerate(categories)}
+        unknown = {c: row[5 + 2 * i] or 0 for i, c in enumerate(categories)}
+        
+        buckets = " ".join(f"WHEN free_gb < {limit} THEN '<{limit}'" for limit in FREE_SPACE_BUCKETS)
+        cpu_generations = dict(self.db.execute("SELECT cpu, COUNT(*) FROM latest WHERE error = 0 GROUP BY cpu ORDER BY cpu"))
+        ram_gb = dict(self.db.execute("SELECT CAST(ram_gb AS INTEGER), COUNT(*) FROM latest WHERE error = 0 "
+                                      "GROUP BY 1 ORDER BY 1"))
+        free_gb = {bucket: count for bucket, count, _ in self.db.execute(
+            f"SELECT CASE {buckets} ELSE '>={FREE_SPACE_BUCKETS[-1]}' END, COUNT(*), MIN(free_gb) "
+            "FROM latest WHERE error = 0 GROUP BY 1 ORDER BY 3")}
+        evaluated = hosts - errors
+        return {
+            "hosts": hosts,
+            "records": self.db.execute("SELECT COUNT(*) FROM hosts").fetchone()[0],
+            "compatible": compatible,
+            "not_compatible": evaluated - compatible - incomplete,
+            "incomplete": incomplete,
+            "errors": errors,
+            "pass_rate": round(compatible / evaluated, 4) if evaluated else None,
+            "failures": dict(sorted(((c, n) for c, n in failures.items() if n), key=lambda item: -item[1])),
+            "unknown": dict(sorted(((c, n) for c, n in unknown.items() if n), key=lambda item: -item[1])),
+            "cpu_generations": cpu_generations,
+            "ram_gb": {str(gb): count for gb, count in ram_gb.items()},
+            "free_gb": free_gb
+        }
+
+    def close(self):
+        self.db.close()
+
+
+def aggregate_fleet(directory, index_path=None, workers=None, chunk_size=200, policy=None):
+    """Aggregate a directory of export files into a fleet report, reading only the new or modified files.
+
+    The files are read on a process pool, at most two chunks per worker in
+    flight; the index (by default .compcheckwin11-index.sqlite in directory)
+    keeps the hosts of the files read by earlier runs.
+    """
+    from collections import deque
+    
+    start = time.perf_counter()
+    index = FleetIndex(index_path or os.path.join(directory, ".compcheckwin11-index.sqlite"), policy)
+    try:
+        files, todo = index.plan(scan_export_files(directory))
+        files["read"] = 0
+        files["errors"] = 0
+        
+        def collect(results):
+            index.store(results)
+            files["read"] += len(results)
+            files["errors"] += sum(1 for result in results if result[4])
+            
+        def chunks():
+            while True:
+                chunk = todo.fetchmany(chunk_size)
+                if not chunk:
+                    return
+                yield [(os.path.join(directory, path), mtime_ns, size) for path, mtime_ns, size in chunk]
+                
+        def relative(results):
+            return [(os.path.relpath(path, directory), *rest) for path, *rest in results]
+            
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            for chunk in chunks():
+                collect(relative(summarise_export_files(chunk, policy)))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in chunks():
+                    pending.append(pool.submit(summarise_export_files, chunk, policy))
+                    if len(pending) >= workers * 2:
+                        collect(relative(pending.popleft().result()))
+                while pending:
+                    collect(relative(pending.popleft().result()))
+                    
+        report = {"files": files, **index.report()}
+    finally:
+        index.close()
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def build_parser():
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        prog="CompCheckWin11",
+        description="Check whether this machine meets the Windows 11 requirements. Without a command the GUI is shown."
+    )
+    commands = parser.add_subparsers(dest="command")
+    
+    check = commands.add_parser("check", help="run the checks without a GUI and print the results")
+    check.add_argument("--format", choices=["json", "ndjson"], default="json", help="output format (default: json)")
+    check.add_argument("--no-cache", action="store_true", help="neither read nor write the probe cache")
+    check.add_argument("--refresh", action="store_true", help="re-run every probe, then update the cache")
+    check.add_argument("--workers", type=int, default=4, help="number of probes run in parallel (default: 4)")
+    check.add_argument("--probe-timeout", type=float, help="seconds before a probe is reported as unknown (default: 60)")
+    check.add_argument("--timeout", type=float, help="seconds before the whole scan is aborted (default: 180)")
+    check.add_argument("--record", metavar="DIR", help="record every probe output as a replay fixture in DIR")
+    check.add_argument("--replay", metavar="DIR", help="read the probe outputs from a recorded fixture in DIR")
+    check.add_argument("--async", dest="use_async", action="store_true",
+                       help="run the probe commands concurrently as asyncio subprocesses, without a shell")
+    check.add_argument("--export", metavar="FILE",
+                       help="also write the results and raw probe data to FILE (.json, .ndjson or .csv, optionally .gz or .zst)")
+    check.add_argument("--append", action="store_true", help="append the --export record to an NDJSON or CSV archive")
+    check.add_argument("--trace", metavar="FILE", help="append a JSON line for every probe, fact and command span to FILE")
+    check.add_argument("--otel", action="store_true", help="send the spans to OpenTelemetry (needs opentelemetry-api)")
+    
+    batch = commands.add_parser("batch", help="evaluate an inventory of raw probe results from many hosts")
+    batch.add_argument("inventory", help="NDJSON file of {\"host\", \"raw\"} records, e.g. an export archive "
+                                        "(.gz and .zst are decompressed), - for stdin")
+    batch.add_argument("--format", choices=["json", "ndjson"], default="json",
+                       help="json prints the aggregated report, ndjson one line per host then the report")
+    batch.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    batch.add_argument("--chunk-size", type=int, default=500, help="hosts sent to a worker at once (default: 500)")
+    batch.add_argument("--store", metavar="FILE", help="append a fixed-width record of every host to FILE")
+    
+    query = commands.add_parser("query", help="count hosts in a record file written by batch --store")
+    query.add_argument("records", help="host record file")
+    query.add_argument("--fails-only", nargs="+", metavar="CATEGORY", choices=list(Win11Checker.CHECKS),
+                       help="count the hosts failing exactly these categories")
+    query.add_argument("--evaluate", action="store_true", help="re-evaluate the stored facts with the current rules")
+    
+    check_parity = commands.add_parser("check-parity", help="compare the column evaluator with the per-host checks")
+    check_parity.add_argument("--hosts", type=int, default=1000, help="number of random hosts (default: 1000)")
+    check_parity.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    
+    daemon = commands.add_parser("daemon", help="keep the checker running and answer queries over local IPC")
+    daemon.add_argument("--address", help="named pipe or Unix socket (default: per user)")
+    daemon.add_argument("--interval", type=float, default=3600.0, help="seconds between scheduled refreshes (default: 3600)")
+    daemon.add_argument("--watch", type=float, default=30.0,
+                        help="seconds between two checks of the change signals (default: 30)")
+    
+    client = commands.add_parser("client", help="query a running daemon")
+    client.add_argument("op", nargs="?", default="status", choices=["status", "result", "category", "refresh", "ping"],
+                        help="what to ask (default: status)")
+    client.add_argument("--address", help="named pipe or Unix socket of the daemon (default: per user)")
+    client.add_argument("--name", choices=list(Win11Checker.CHECKS), help="category, for the category op")
+    client.add_argument("--full", action="store_true", help="refresh every category, not only the changed ones")
+    client.add_argument("--policy", help="evaluate the daemon's results against this policy")
+    
+    bench_daemon = commands.add_parser("bench-daemon", help="time queries to a daemon serving the sample machine")
+    bench_daemon.add_argument("--requests", type=int, default=2000, help="requests per client (default: 2000)")
+    bench_daemon.add_argument("--clients", type=int, default=4, help="concurrent clients (default: 4)")
+    
+    fleet = commands.add_parser("fleet", help="aggregate a directory of exported results into a fleet report")
+    fleet.add_argument("directory", help="folder of export files (.json, .ndjson, .csv, optionally .gz or .zst)")
+    fleet.add_argument("--index", metavar="FILE",
+                       help="sqlite index of the files already read (default: .compcheckwin11-index.sqlite in the folder)")
+    fleet.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    fleet.add_argument("--chunk-size", type=int, default=200, help="files sent to a worker at once (default: 200)")
+    
+    commands.add_parser("check-async", help="compare the asyncio runner with the sample machine, using stub commands")
+    
+    make_stubs = commands.add_parser("make-stubs", help="write stand-ins for the probe commands, for check --async on Linux")
+    make_stubs.add_argument("folder", help="folder to put first on PATH")
+    
+    make_inventory = commands.add_parser("make-inventory", help="write a random batch inventory, for trying the batch command")
+    make_inventory.add_argument("output", help="NDJSON file to write, - for stdout")
+    make_inventory.add_argument("--hosts", type=int, default=1000, help="number of hosts (default: 1000)")
+    make_inventory.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    
+    bench_pipeline = commands.add_parser("bench-pipeline", help="time run_all_checks against recorded probe data")
+    bench_pipeline.add_argument("--replay", metavar="DIR", help="recorded fixture (default: built-in sample machine)")
+    bench_pipeline.add_argument("--iterations", type=int, default=1000, help="number of runs (default: 1000)")
+    bench_pipeline.add_argument("--profile", action="store_true", help="print the top cProfile entries")
+    
+    bench_firmware = commands.add_parser("bench-firmware", help="time each firmware type detector")
+    bench_firmware.add_argument("--record", metavar="DIR", help="also record the detectors' outputs and timings in DIR")
+    bench_firmware.add_argument("--replay", metavar="DIR", help="report the timings recorded in DIR")
+    bench_firmware.add_argument("--runs", type=int, default=3, help="number of runs of each detector (default: 3)")
+    
+    bench_cpu = commands.add_parser("bench-cpu", help="time the classification of CPU names against the CPU database")
+    bench_cpu.add_argument("--count", type=int, default=1000000, help="number of names classified (default: 1000000)")
+    bench_cpu.add_argument("--distinct", type=int, default=10000, help="distinct names they are drawn from (default: 10000)")
+    bench_cpu.add_argument("--max-seconds", type=float, default=1.0, help="upper bound of the run time (default: 1)")
+    
+    bench_parsers = commands.add_parser("bench-parsers", help="time the output parsers on their corpus")
+    bench_parsers.add_argument("--iterations", type=int, default=10000, help="passes over the corpus (default: 10000)")
+    
+    fuzz_parsers_command = commands.add_parser("fuzz-parsers", help="feed the output parsers random variants of their corpus")
+    fuzz_parsers_command.add_argument("--iterations", type=int, default=100000, help="number of variants (default: 100000)")
+    fuzz_parsers_command.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    fuzz_parsers_command.add_argument("--corpus", metavar="DIR", help="replay the inputs saved in DIR and save new crashes there")
+    
+    bench_probes = commands.add_parser("bench-probes", help="time every check over several runs and report percentiles")
+    bench_probes.add_argument("--replay", metavar="DIR", help="recorded fixture (default: built-in sample machine)")
+    bench_probes.add_argument("--latency", default="0",
+                              help="seconds each command takes, or \"recorded\" to replay the recorded durations (default: 0)")
+    bench_probes.add_argument("--runs", type=int, default=20, help="number of measured runs (default: 20)")
+    bench_probes.add_argument("--warmup", type=int, default=3, help="number of runs before measuring (default: 3)")
+    bench_probes.add_argument("--output", metavar="FILE", help="also write the report to FILE")
+    
+    bench_diff = commands.add_parser("bench-diff", help="compare two bench-probes reports and fail on regressions")
+    bench_diff.add_argument("baseline", help="report of the reference run")
+    bench_diff.add_argument("current", help="report of the run to check")
+    bench_diff.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown as a fraction (default: 0.1)")
+    bench_diff.add_argument("--statistic", default="p50", choices=["min", "mean", "p50", "p90", "p99", "max"],
+                            help="statistic compared (default: p50)")
+    bench_diff.add_argument("--min-ms", type=float, default=0.05, help="ignore slowdowns below this (default: 0.05)")
+    
+    bench_import = commands.add_parser("bench-import", help="check that importing the checker stays cheap")
+    bench_import.add_argument("--max-ms", type=float, default=50.0, help="upper bound of the import time (default: 50)")
+    bench_import.add_argument("--runs", type=int, default=5, help="number of measured imports (default: 5)")
+    
+    for command in (check, batch, query, check_parity, bench_probes, daemon, fleet):
+        command.add_argument("--policy", default=DEFAULT_POLICY,
+                             help=f"requirements: {', '.join(POLICIES)} or a JSON policy file (default: {DEFAULT_POLICY})")
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "policy", None):
+        try:
+            load_policy(args.policy)
+        except ValueError as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+            
+    if args.command == "check":
+        # Recorded or replayed runs must neither read nor pollute the cache
+
+        backend = None
+        if args.use_async and (args.replay or args.record):
+            print(json.dumps({"error": "--async runs the live commands, it cannot be combined with --replay or --record"}))
+            return EXIT_ERROR
+        if args.use_async:
+            # Registry, files and native facts still come from the default backend
+
+            backend = NativeProbeBackend()
+        elif args.replay:
+            backend = ReplayProbeBackend(args.replay)
+        elif args.record:
+            backend = RecordingProbeBackend(NativeProbeBackend(), args.record)
+        sinks = []
+        try:
+            if args.trace:
+                sinks.append(tracer.add_sink(JsonLinesSink(args.trace)))
+            if args.otel:
+                sinks.append(tracer.add_sink(OpenTelemetrySink()))
+        except (OSError, ImportError) as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+        try:
+            return run_headless(args.format, use_cache=not (args.no_cache or args.replay or args.record),
+                                force_refresh=args.refresh, max_workers=args.workers, backend=backend,
+                                probe_timeout=args.probe_timeout, run_timeout=args.timeout, policy=args.policy,
+                                use_async=args.use_async, export=args.export, append=args.append)
+        finally:
+            for sink in sinks:
+                tracer.remove_sink(sink)
+                if isinstance(sink, JsonLinesSink):
+                    sink.close()
+    if args.command == "batch":
+        records = []
+        store = HostRecordFile(args.store) if args.store else None
+        
+        def on_host(summary):
+            if args.format == "ndjson":
+                sys.stdout.write(json.dumps(summary) + "\n")
+            if store is not None and "error" not in summary:
+                records.append(HostRecord.from_summary(summary))
+                if len(records) >= 10000:
+                    store.append(records)
+                    records.clear()
+                    
+        try:
+            if args.inventory == "-":
+                report = run_batch(sys.stdin, args.workers, args.chunk_size, on_host, args.policy)
+            else:
+                with open_export(args.inventory) as f:
+                    report = run_batch(f, args.workers, args.chunk_size, on_host, args.policy)
+            if store is not None:
+                store.append(records)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+        if args.format == "ndjson":
+            print(json.dumps({"summary": report.as_dict()}))
+        else:
+            print(json.dumps(report.as_dict(), indent=2))
+        return 0
+    if args.command == "query":
+        try:
+            store = HostRecordFile(args.records)
+            report = {"hosts": len(store), "failures": store.failure_counts()}
+            if args.fails_only:
+                report["fails_only"] = {"categories": args.fails_only, "hosts": store.count_failing_only(*args.fails_only)}
+            if args.evaluate:
+                start = time.perf_counter()
+                compatible, _ = store.evaluate(args.policy)
+                report["evaluate"] = {"compatible": int(sum(compatible)), "ms": round((time.perf_counter() - start) * 1000, 2)}
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+        print(json.dumps(report, indent=2))
+        return 0
+    if args.command == "check-parity":
+        report = check_evaluator_parity(args.hosts, args.seed, args.policy)
+        print(json.dumps(report, indent=2))
+        return 0 if report["passed"] else 1
+    if args.command == "check-async":
+        report = check_async_backend()
+        print(json.dumps(report, indent=2))
+        return 0 if report["passed"] else 1
+    if args.command == "daemon":
+        import signal
+        
+        # A service manager stops the daemon with SIGTERM, clean up the socket as on Ctrl+C
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        server = CheckerDaemon(Win11Checker(policy=args.policy), args.address, args.interval, args.watch)
+        try:
+            server.start()
+            print(json.dumps({"address": server.address, "version": server.snapshot["version"]}), flush=True)
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+        finally:
+            server.close()
+        return 0
+    if args.command == "client":
+        from multiprocessing import AuthenticationError
+        
+        params = {key: value for key, value in (("name", args.name), ("policy", args.policy)) if value}
+        if args.full:
+            params["full"] = True
+        try:
+            with DaemonClient(args.address) as connection:
+                response = connection.request(args.op, **params)
+        except (OSError, EOFError, AuthenticationError) as e:
+            print(json.dumps({"error": f"daemon not reachable: {e}"}))
+            return EXIT_ERROR
+        print(json.dumps(response, indent=2))
+        if not response.get("ok"):
+            return EXIT_ERROR
+        if "compatible" in response:
+            return EXIT_COMPATIBLE if response["compatible"] else EXIT_NOT_COMPATIBLE
+        return 0
+    if args.command == "bench-daemon":
+        print(json.dumps(benchmark_daemon(args.requests, args.clients), indent=2))
+        return 0
+    if args.command == "fleet":
+        try:
+            report = aggregate_fleet(args.directory, args.index, args.workers, args.chunk_size, args.policy)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+        print(json.dumps(report, indent=2))
+        return 0
+    if args.command == "make-stubs":
+        print(json.dumps({"folder": os.path.abspath(args.folder), "commands": write_stub_executables(args.folder)}))
+        return 0
+    if args.command == "make-inventory":
+        if args.output == "-":
+            generate_inventory(sys.stdout, args.hosts, args.seed)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                generate_inventory(f, args.hosts, args.seed)
+        return 0
+    if args.command == "bench-pipeline":
+        backend = ReplayProbeBackend(args.replay) if args.replay else None
+        report = benchmark_pipeline(backend, args.iterations, args.profile)
+        profile = report.pop("profile", None)
+        print(json.dumps(report, indent=2))
+        if profile:
+            print(profile)
+        return 0
+    if args.command == "bench-firmware":
+        if args.replay:
+            backend = ReplayProbeBackend(args.replay)
+        elif args.record:
+            backend = RecordingProbeBackend(NativeProbeBackend(), args.record)
+        else:
+            backend = None
+        print(json.dumps(benchmark_firmware_detection(backend, args.runs), indent=2))
+        if args.record and not args.replay:
+            backend.save()
+        return 0
+    if args.command == "bench-cpu":
+        report = benchmark_cpu_classification(args.count, distinct=args.distinct)
+        report["passed"] = report["seconds"] <= args.max_seconds
+        print(json.dumps(report, indent=2))
+        return 0 if report["passed"] else 1
+    if args.command == "bench-parsers":
+        print(json.dumps(benchmark_parsers(args.iterations), indent=2))
+        return 0
+    if args.command == "fuzz-parsers":
+        report = fuzz_parsers(args.iterations, args.seed, args.corpus)
+        print(json.dumps(report, indent=2))
+        return 0 if report["passed"] else 1
+    if args.command == "bench-probes":
+        try:
+            latency = args.latency if args.latency == "recorded" else float(args.latency)
+            if args.replay:
+                backend = ReplayProbeBackend(args.replay, latency)
+            elif latency == "recorded":
+                raise ValueError("--latency recorded needs --replay")
+            else:
+                backend = FakeProbeBackend(latency=latency)
+            report = benchmark_probes(backend, args.runs, args.warmup, args.policy)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    json.dump(report, f, indent=2)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+        print(json.dumps(report, indent=2))
+        return 0
+    if args.command == "bench-diff":
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+            with open(args.current, "r", encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": str(e)}))
+            return EXIT_ERROR
+        report = diff_benchmark_reports(baseline, current, args.threshold, args.statistic, args.min_ms)
+        print(json.dumps(report, indent=2))
+        return 0 if report["passed"] else 1
+    if args.command == "bench-import":
+        report = benchmark_import_time(args.max_ms, args.runs)
+        print(json.dumps(report, indent=2))
+        return 0 if report["passed"] else 1
+        
+    run_gui()
+    return EXIT_COMPATIBLE
+
+
+def run_gui():
+    load_gui_modules()
+    
     # Create the main window
 
     root = tk.Tk()
@@ -1266,4 +5960,4 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file